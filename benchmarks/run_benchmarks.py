@@ -0,0 +1,318 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from utils import registry
+from utils.loader import load_alay_dictionary, load_stopwords
+from utils.processing import (LABEL_MAP, clean_text, get_stemmer, preprocess_comments, preprocess_features,
+                              classify_comments)
+
+# Benchmark tiap tahap preprocessing & inferensi pada komentar sintetis.
+#   python -m benchmarks.run_benchmarks --output benchmarks/results/hasil.json
+#   python -m benchmarks.run_benchmarks --baseline benchmarks/results/lama.json
+# Exit code 1 jika ada tahap yang regresi melewati ambang di thresholds.json.
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_THRESHOLDS_PATH = os.path.join(BENCHMARK_DIR, "thresholds.json")
+DATASET_PATH = os.path.join(registry.BASE_DIR, "data", "dataset_penelitian.xlsx")
+
+DEFAULT_SIZES = [100, 1000, 5000]
+
+# Tahap cepat diulang sampai total waktunya minimal sekian detik, supaya p95
+# dihitung dari cukup banyak sampel (bukan praktis nilai maksimum dari 5 ulangan)
+MIN_MEASURE_SECONDS = 1.0
+MAX_REPEATS = 1000
+DEFAULT_COLD_REPEATS = 3
+
+# --- Korpus sintetis ---
+# Kosakata diambil dari kamus alay dan komentar dataset penelitian; panjang komentar
+# mengikuti distribusi panjang komentar asli. Tidak butuh koneksi internet.
+def build_vocabulary(vocab_size, seed):
+    rng = random.Random(seed)
+    dataset = pd.read_excel(DATASET_PATH)
+    words = dataset["comment"].astype(str).str.lower().str.split().explode()
+    dataset_words = words.value_counts().head(vocab_size).index.tolist()
+    lengths = dataset["comment"].astype(str).str.split().str.len().clip(lower=1).tolist()
+
+    alay_df = pd.read_csv(registry.KAMUS_ALAY_PATH, header=None, names=["alay", "formal"], encoding="ISO-8859-1")
+    alay_words = alay_df["alay"].dropna().astype(str).tolist()
+    alay_words = rng.sample(alay_words, min(len(alay_words), vocab_size // 5))
+    return dataset_words + alay_words, lengths
+
+# Gangguan khas komentar YouTube: URL, mention, entitas HTML, huruf berulang, tanda baca
+_NOISE = [
+    lambda rng, w: "https://youtu.be/" + w,
+    lambda rng, w: "@" + w,
+    lambda rng, w: w + "&#39;" + w,
+    lambda rng, w: w + "&quot;",
+    lambda rng, w: w + w[-1] * rng.randint(2, 5),
+    lambda rng, w: w + rng.choice("!?.,") * rng.randint(1, 3),
+    lambda rng, w: "<br>" + w,
+]
+
+def generate_comments(n, vocabulary, lengths, seed, noise_rate=0.1):
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(n):
+        words = []
+        for _ in range(rng.choice(lengths)):
+            word = rng.choice(vocabulary)
+            if word and rng.random() < noise_rate:
+                word = rng.choice(_NOISE)(rng, word)
+            words.append(word)
+        comments.append(" ".join(words))
+    return comments
+
+# --- Pengukuran ---
+def _percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def _peak_memory_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+# Cache stemmer Sastrawi berlaku untuk seluruh proses; setelah warmup semua kata
+# kosakata benchmark sudah tersimpan, jadi pass "dingin" harus mengosongkannya dulu
+def reset_stemmer_cache():
+    from Sastrawi.Stemmer.Cache.ArrayCache import ArrayCache
+    get_stemmer().cache = ArrayCache()
+
+# Jalankan fn minimal repeats kali (setelah warmup), ditambah sampai total waktunya
+# mencapai min_seconds. items = jumlah komentar per pemanggilan, dipakai untuk
+# menghitung throughput. setup dipanggil sebelum tiap ulangan, di luar waktu yang
+# diukur. Memori puncak diukur di pass terpisah karena tracemalloc memperlambat eksekusi.
+def measure(fn, items, repeats, warmup=1, setup=None, min_seconds=MIN_MEASURE_SECONDS):
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    while len(latencies) < repeats or (sum(latencies) < min_seconds and len(latencies) < MAX_REPEATS):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    if setup is not None:
+        setup()
+
+    median = statistics.median(latencies)
+    return {
+        "items": items,
+        "repeats": len(latencies),
+        "throughput": items / median if median > 0 else float("inf"),
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "peak_memory_mb": _peak_memory_mb(fn),
+    }
+
+# Latensi per komentar (bukan per batch) untuk clean_text
+def measure_per_item(fn, inputs, warmup=True):
+    if warmup:
+        for value in inputs:
+            fn(value)
+
+    latencies = []
+    start_total = time.perf_counter()
+    for value in inputs:
+        start = time.perf_counter()
+        fn(value)
+        latencies.append(time.perf_counter() - start)
+    total = time.perf_counter() - start_total
+
+    return {
+        "items": len(inputs),
+        "repeats": 1,
+        "throughput": len(inputs) / total if total > 0 else float("inf"),
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "peak_memory_mb": _peak_memory_mb(lambda: [fn(value) for value in inputs]),
+    }
+
+# --- Tahap yang diukur ---
+def run_benchmarks(sizes, repeats, vocab_size, seed, cold_repeats=DEFAULT_COLD_REPEATS, log=print):
+    stages = {}
+    skipped = {}
+
+    def record(name, result):
+        stages[name] = result
+        log(f"{name:<40} {result['throughput']:>12.1f} item/detik  "
+            f"p95 {result['p95_ms']:>9.2f} ms  puncak {result['peak_memory_mb']:>8.2f} MB")
+
+    # 1. Pemuatan kamus
+    record("load_alay_dictionary", measure(
+        lambda: load_alay_dictionary(registry.KAMUS_ALAY_PATH, registry.ADDITIONAL_ALAY_PATH), 1, repeats))
+    record("load_stopwords", measure(
+        lambda: load_stopwords(registry.STOPWORDS_PATH, registry.ADDITIONAL_STOPWORDS,
+                               registry.EXCLUDED_STOPWORDS), 1, repeats))
+
+    alay_dict = registry.get_alay_dict()
+    stopwords = registry.get_stopwords()
+    vocabulary, lengths = build_vocabulary(vocab_size, seed)
+    corpora = {size: generate_comments(size, vocabulary, lengths, seed + size) for size in sizes}
+
+    # 2. Preprocessing teks. Pass dingin mengosongkan cache stemmer sebelum tiap ulangan
+    # sehingga biaya stemming (tahap termahal) ikut terukur; tahap lain mengukur kondisi
+    # server yang sudah berjalan (stemmer sudah hangat)
+    smallest = corpora[min(sizes)]
+    if cold_repeats > 0:
+        cold_df = pd.DataFrame({"comment": smallest})
+        record(f"preprocess_comments_cold[{min(sizes)}]", measure(
+            lambda: preprocess_comments(cold_df, alay_dict, stopwords), len(smallest), cold_repeats,
+            warmup=0, setup=reset_stemmer_cache, min_seconds=0))
+    record("clean_text", measure_per_item(lambda text: clean_text(text, alay_dict, stopwords), smallest))
+    for size, comments in corpora.items():
+        df = pd.DataFrame({"comment": comments})
+        record(f"preprocess_comments[{size}]", measure(
+            lambda: preprocess_comments(df, alay_dict, stopwords), size, repeats))
+
+    # 3. Inferensi (butuh artefak model lengkap)
+    missing = [path for path in (registry.TFIDF_PATH, registry.PCA_PATH, registry.MODEL_PATH) if not os.path.exists(path)]
+    if missing:
+        reason = "artefak model tidak ditemukan: " + ", ".join(os.path.basename(path) for path in missing)
+        for name in ("preprocess_features", "classify_comments", "fused_engine", "upload_to_excel"):
+            skipped[name] = reason
+        log(f"Tahap inferensi dilewati ({reason})")
+        return stages, skipped
+
+    from utils.processing import load_models
+    tfidf, pca, model = load_models(registry.TFIDF_PATH, registry.PCA_PATH, registry.MODEL_PATH)
+    engine = registry.get_inference_engine()
+
+    for size, comments in corpora.items():
+        cleaned = preprocess_comments(pd.DataFrame({"comment": comments}), alay_dict, stopwords)["cleaned_comment"]
+        features = preprocess_features(cleaned, tfidf, pca)
+        record(f"preprocess_features[{size}]", measure(lambda: preprocess_features(cleaned, tfidf, pca), size, repeats))
+        record(f"classify_comments[{size}]", measure(lambda: classify_comments(features, model), size, repeats))
+        record(f"fused_engine[{size}]", measure(lambda: engine.predict(cleaned), size, repeats))
+        if engine.token_index is not None:
+            # TF-IDF dirakit dari id token hasil cleaning (tanpa tokenisasi ulang)
+            token_ids = preprocess_comments(pd.DataFrame({"comment": comments}), alay_dict, stopwords,
+                                            token_index=engine.token_index)["token_ids"].tolist()
+            record(f"fused_engine_token_ids[{size}]",
+                   measure(lambda: engine.predict_token_ids(token_ids), size, repeats))
+
+    # 4. Jalur lengkap halaman klasifikasi: upload Excel -> hasil Excel
+    for size, comments in corpora.items():
+        upload = io.BytesIO()
+        pd.DataFrame({"comment": comments}).to_excel(upload, index=False, engine="openpyxl")
+
+        def upload_to_excel():
+            upload.seek(0)
+            df = pd.read_excel(upload)
+            cleaned_df = preprocess_comments(df, alay_dict, stopwords)
+            cleaned_df["predicted_label"] = engine.predict(cleaned_df["cleaned_comment"])
+            cleaned_df["label_text"] = cleaned_df["predicted_label"].map(LABEL_MAP)
+            output_buffer = io.BytesIO()
+            cleaned_df.to_excel(output_buffer, index=False, engine="openpyxl")
+
+        record(f"upload_to_excel[{size}]", measure(upload_to_excel, size, repeats))
+
+    return stages, skipped
+
+# --- Perbandingan dengan baseline ---
+def load_thresholds(path):
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    return config.get("default", {}), config.get("stages", {})
+
+def compare(current, baseline, thresholds_path):
+    defaults, overrides = load_thresholds(thresholds_path)
+    regressions = []
+    for name, result in current.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+
+        limits = {**defaults, **overrides.get(name.split("[")[0], {}), **overrides.get(name, {})}
+        checks = [
+            ("throughput", "throughput_drop", previous["throughput"] - result["throughput"], previous["throughput"]),
+            ("p95_ms", "p95_increase", result["p95_ms"] - previous["p95_ms"], previous["p95_ms"]),
+            ("peak_memory_mb", "peak_memory_increase",
+             result["peak_memory_mb"] - previous["peak_memory_mb"], previous["peak_memory_mb"]),
+        ]
+        for metric, limit_name, delta, reference in checks:
+            limit = limits.get(limit_name)
+            if limit is None or reference <= 0:
+                continue
+            # tahap yang sangat cepat terlalu berisik untuk dibandingkan latensinya
+            if metric == "p95_ms" and previous["p95_ms"] < limits.get("min_p95_ms", 0):
+                continue
+            if metric == "peak_memory_mb" and previous["peak_memory_mb"] < limits.get("min_peak_memory_mb", 0):
+                continue
+            change = delta / reference
+            if change > limit:
+                regressions.append({
+                    "stage": name, "metric": metric, "baseline": previous[metric],
+                    "current": result[metric], "change": change, "limit": limit,
+                })
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline preprocessing & klasifikasi sentimen.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Ukuran korpus sintetis.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--cold-repeats", type=int, default=DEFAULT_COLD_REPEATS,
+                        help="Ulangan pass dingin (cache stemmer dikosongkan); 0 untuk melewati.")
+    parser.add_argument("--vocab-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON.")
+    parser.add_argument("--baseline", help="File JSON hasil sebelumnya untuk dibandingkan.")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS_PATH)
+    args = parser.parse_args(argv)
+
+    stages, skipped = run_benchmarks(sorted(args.sizes), args.repeats, args.vocab_size, args.seed, args.cold_repeats)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": sorted(args.sizes),
+            "repeats": args.repeats,
+            "cold_repeats": args.cold_repeats,
+            "vocab_size": args.vocab_size,
+            "seed": args.seed,
+        },
+        "stages": stages,
+        "skipped": skipped,
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Hasil disimpan ke {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["stages"]
+        regressions = compare(stages, baseline, args.thresholds)
+        for item in regressions:
+            print(f"REGRESI {item['stage']} {item['metric']}: {item['baseline']:.2f} -> {item['current']:.2f} "
+                  f"(memburuk {item['change']:.0%}, batas {item['limit']:.0%})")
+        if regressions:
+            return 1
+        print("Tidak ada regresi terhadap baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
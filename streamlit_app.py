@@ -1,45 +1,131 @@
 import streamlit as st
 import pandas as pd
 import os
-import joblib
-import sklearn
-import io
+import functools
+import shutil
+import uuid
 
 from streamlit_option_menu import option_menu
 
-# untuk menggunakan fungsi yang ada di processing.py
-from utils.processing import preprocess_comments, clean_text, preprocess_features, classify_comments
-
-# untuk menggunakan fungsi yang ada di loader.py
-from utils.loader import load_alay_dictionary, load_stopwords
-
-from pathlib import Path
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import plotly.express as px
-
-# --- LOAD RESOURCE ---
-# kamus alay
-alay_dict = load_alay_dictionary(
-    kamusalay_filepath = os.path.join("data", "kamusalay2.csv"),
-    additional_filepath = os.path.join("data", "additional_dict-alay.csv")
-)
-
-# stopwords
-stopwords = load_stopwords(
-    stopwords_filepath= os.path.join("data", "stopwordbahasa.csv"),
-    additional_stopwords=["lah", "nya", "kalau", "the", "of", "and", "i", "aku", "gue", "kak",
-    "kamu", "a", "to", "ku", "rela", "kakak", "eh", "for", "did", "is", "ah", "cui", "nge"],  # extend manual
-    excluded_stopwords=["tidak", "kok", "serta", "peserta", "harus", "lagi", "dong", "doang", 
-    "tolong", "kenapa", "apa", "kapan", "bagaimana", "dimana", "berapa", "tahun", "ada", "mana", 
-    "siapa", "terus", "penerus", "gitu", "begitu", "gini", "begini","bisa", "dapat", "ingin", 
-    "mungkin", "jadi", "atur", "pengaturan", "sudah", "udah","diri", "sendiri", "memang", "agak", 
-    "sedikit", "kurang", "boleh", "juga", "kembali", "balik", "soal", "ya","sudah", "ingin", 
-    "tanya", "saja", "pada", "ayo", "keluar", "lalu", "tiap","hari", "bulan", "kalau", "kalian", 
-    "masih", "kira", "masalah", "sekarang", "belum", "pasti", "sebelum", "sesudah", "terlalu", 
-    "lebih", "tangis", "pernah", "satu", "dua", "tiga", "empat", "lima", "enam", "tujuh", 
-    "delapan", "sembilan", "sepuluh", "sebelas", "season", "lain"]   # exclude
-)
+# registry resource seumur proses (kamus, stopwords, stemmer, model) + laporan startup
+from utils import registry
+
+with registry.timed("utils.processing + utils.snapshot + utils.wordclouds"):
+    # untuk menggunakan fungsi yang ada di processing.py
+    from utils.processing import LABEL_MAP
+
+    # job klasifikasi latar belakang (pool worker per server)
+    from utils.jobs import CANCELLED, FAILED, FINISHED, QUEUED, JobQueueFull, job_workdir, run_classification
+
+    # snapshot kolumnar + agregat dashboard
+    from utils.snapshot import load_dashboard_aggregates, load_table
+
+    # index frekuensi kata + cache gambar wordcloud
+    from utils.wordclouds import load_term_index, wordcloud_png
+
+# tampilkan wordcloud per sentimen dari index frekuensi kata
+def show_wordclouds(term_index):
+    for label_name in ["Positif", "Netral", "Negatif"]:
+        png = wordcloud_png(term_index.get(label_name, {}))
+        if png is None:
+            continue
+        st.markdown(f"**{label_name}**")
+        st.image(png)
+
+# panel rincian waktu per tahap + counter dari satu run klasifikasi
+def show_run_metrics(metrics):
+    summary = metrics.to_dict()
+    with st.expander("📊 Rincian Waktu per Tahap"):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Baris/detik", f"{summary['rows_per_second']:.1f}")
+        col2.metric("Total waktu tahap", f"{summary['total_seconds']:.2f} s")
+        col3.metric("Waktu run", f"{summary['elapsed_seconds'] or 0:.2f} s")
+
+        if summary["stages"]:
+            st.dataframe(pd.DataFrame(summary["stages"]), hide_index=True)
+        if summary["counters"]:
+            st.dataframe(pd.DataFrame(list(summary["counters"].items()), columns=["counter", "nilai"]),
+                         hide_index=True)
+
+        col1, col2 = st.columns(2)
+        col1.download_button("⬇️ Unduh JSON", data=metrics.to_json(indent=2),
+                             file_name="metrik_klasifikasi.json", mime="application/json")
+        col2.download_button("⬇️ Unduh Prometheus", data=metrics.to_prometheus(),
+                             file_name="metrik_klasifikasi.prom", mime="text/plain")
+
+# progres job yang masih berjalan, diperbarui tiap detik tanpa memblokir halaman
+@st.fragment(run_every=1)
+def show_job_progress(job):
+    if job.status in FINISHED:
+        st.rerun()
+
+    if job.status == QUEUED:
+        status_text = "Menunggu giliran di antrean..."
+    else:
+        status_text = f"Sedang memproses... {job.rows_done} baris selesai"
+        if job.total_rows:
+            status_text += f" dari ±{job.total_rows}"
+        eta = job.eta_seconds()
+        if eta is not None:
+            status_text += f" (perkiraan sisa {eta:.0f} detik)"
+    st.progress(job.progress() or 0.0, text=status_text)
+
+    if job.cancel_requested:
+        st.caption("Membatalkan klasifikasi...")
+    elif st.button("⛔ Batalkan Klasifikasi"):
+        job.cancel()
+
+# hasil job yang sudah selesai (tetap tersedia setelah halaman dimuat ulang)
+def show_job_result(job):
+    if job.status == CANCELLED:
+        st.info("Klasifikasi dibatalkan.")
+        return
+    if job.status == FAILED:
+        st.error(f"Klasifikasi gagal: {job.error}")
+        return
+
+    result = job.result
+    # folder hasil klasifikasi; halaman Pemodelan Topik membaca korpusnya dari sini
+    st.session_state["hasil_klasifikasi"] = result["result_dir"]
+
+    st.success(f"Klasifikasi selesai! {result['total_rows']} baris diproses.")
+    cache_stats = result["token_cache"]
+    st.caption(f"Cache token: {cache_stats['hits']} hit, {cache_stats['misses']} miss "
+               f"({cache_stats['hit_rate']:.1%}), {cache_stats['size']}/{cache_stats['maxsize']} entri")
+    store_stats = result["result_store"]
+    if store_stats is not None:
+        st.caption(f"Hasil tersimpan: {store_stats['hits']} hit, {store_stats['misses']} miss "
+                   f"({store_stats['hit_rate']:.1%}), {store_stats['size']} komentar tersimpan")
+    if result["metrics"] is not None:
+        show_run_metrics(result["metrics"])
+
+    rows = result["rows"]
+    if len(rows) < result["total_rows"]:
+        st.write(f"📄 Pratinjau hasil ({len(rows)} baris pertama):")
+    if len(rows):
+        st.dataframe(rows[["comment", "cleaned_comment", "label_text"]])
+
+    st.subheader("☁️ Wordcloud Hasil Klasifikasi")
+    show_wordclouds(result["term_index"])
+
+    # --- 5. Tombol Unduh ---
+    # file unduhan baru dibuat saat tombol diklik, hanya dengan kolom yang dipilih
+    from utils.export import EXPORT_FORMATS, export_bytes, result_columns
+    from utils.streaming import OUTPUT_MIME_TYPES
+
+    columns = result_columns(result["result_dir"])
+    col1, col2 = st.columns([1, 3])
+    export_format = col1.selectbox("Format unduhan", EXPORT_FORMATS)
+    export_columns = col2.multiselect("Kolom yang diunduh", columns, default=columns)
+    st.download_button(
+        label="⬇️ Unduh Hasil Klasifikasi",
+        # waktu & ukuran file ekspor ikut tercatat di rincian waktu per tahap
+        data=functools.partial(export_bytes, result["result_dir"], export_format, export_columns,
+                               metrics=result["metrics"]),
+        file_name=f"hasil_klasifikasi.{export_format}",
+        mime=OUTPUT_MIME_TYPES[export_format],
+        disabled=not export_columns
+    )
 
 # --- SIDEBAR NAVIGATION dengan option_menu ---
 with st.sidebar:
@@ -81,21 +167,22 @@ with st.sidebar:
 
 # --- HALAMAN ---
 if selected == "Home":
+    # pustaka berat hanya di-import di halaman yang membutuhkannya
+    with registry.timed("plotly"):
+        import plotly.express as px
+
     # halaman dashboard home
     st.title("📊 Dashboard Sentimen Komentar")
     # konten
     data_path = os.path.join("data", "dataset_penelitian.xlsx")
     if os.path.exists(data_path):
-        df = pd.read_excel(data_path)
-
-        # --- Pra-pemrosesan awal ---
-        df["publishedAt"] = pd.to_datetime(df["publishedAt"])
-        df["label_text"] = df["label"].map({0: "Negatif", 1: "Netral", 2: "Positif"})
+        # agregat dashboard dihitung sekali dan dibangun ulang hanya jika file sumber berubah
+        dashboard = load_dashboard_aggregates(data_path)
 
         # --- 1. Statistik Umum ---
         st.subheader("📌 Statistik Umum")
-        total_komentar = df["comment"].count()
-        total_user = df["username"].nunique()
+        total_komentar = dashboard["total_komentar"]
+        total_user = dashboard["total_user"]
 
         col1, col2 = st.columns(2)
         col1.metric("Total Komentar", total_komentar)
@@ -103,12 +190,12 @@ if selected == "Home":
 
         # --- 2. Proporsi Sentimen ---
         st.subheader("📊 Distribusi Sentimen")
-        label_counts = df["label_text"].value_counts().reindex(["Positif", "Netral", "Negatif"])
+        label_counts = dashboard["label_counts"]
         st.plotly_chart(px.pie(values=label_counts.values, names=label_counts.index, title="Proporsi Sentimen"))
 
         # --- 3. Tren Komentar per Hari ---
         st.subheader("📈 Tren Komentar per Hari")
-        trend_df = df.groupby([df["publishedAt"].dt.date, "label_text"]).size().reset_index(name="count")
+        trend_df = dashboard["trend"]
         fig_trend = px.line(trend_df, x="publishedAt", y="count", color="label_text", markers=True,
                             labels={"publishedAt": "Tanggal", "count": "Jumlah Komentar", "label_text": "Sentimen"},
                             title="Tren Jumlah Komentar Harian per Sentimen")
@@ -116,7 +203,7 @@ if selected == "Home":
 
         # --- 4. Komentar dengan Like Terbanyak ---
         st.subheader("👍 Komentar Paling Disukai")
-        top_liked = df.sort_values(by="likeCount", ascending=False).head(5)[["username", "comment", "likeCount"]]
+        top_liked = dashboard["top_liked"]
         for idx, row in top_liked.iterrows():
             st.markdown(f"""
             **{row['username']}** ❤️ {row['likeCount']} likes  
@@ -126,22 +213,9 @@ if selected == "Home":
         # --- 5. Wordcloud per Sentimen ---
         st.subheader("☁️ Wordcloud Kata Umum per Sentimen")
 
+        # frekuensi kata per sentimen disimpan sebagai index, gambar diambil dari cache PNG
         cleaned_data_path = os.path.join("data", "after_preprocessing.xlsx")
-        df_clean = pd.read_excel(cleaned_data_path)
-
-        # Mapping label angka ke teks
-        label_mapping = {0: "Negatif", 1: "Netral", 2: "Positif"}
-        df_clean["label_text"] = df_clean["label"].map(label_mapping)
-
-        for label_name in ["Positif", "Netral", "Negatif"]:
-            text = " ".join(df_clean[df_clean["label_text"] == label_name]["after"].astype(str).tolist())
-            wordcloud = WordCloud(width=800, height=300, background_color="black").generate(text)
-
-            st.markdown(f"**{label_name}**")
-            fig, ax = plt.subplots(figsize=(10, 3))
-            ax.imshow(wordcloud, interpolation='bilinear')
-            ax.axis("off")
-            st.pyplot(fig)
+        show_wordclouds(load_term_index(cleaned_data_path))
 
     else:
         st.error(f"File {data_path} belum ditemukan di folder data.")
@@ -149,55 +223,147 @@ if selected == "Home":
 elif selected == "Klasifikasi Sentimen":
     # halaman klasifikasi sentimen
     st.title("📝 Klasifikasi Sentimen Komentar")
+
+    # pipeline streaming untuk file besar (xlsx, csv, parquet)
+    with registry.timed("openpyxl + utils.streaming"):
+        from utils.streaming import detect_file_type, estimate_rows, iter_comment_chunks
+
+    # kamus alay, stopwords dan cache token diambil dari registry (dimuat sekali per proses)
+    alay_dict = registry.get_alay_dict()
+    stopwords = registry.get_stopwords()
+    token_cache = registry.get_token_cache()
     # konten
-    uploaded_file = st.file_uploader("Upload file komentar (format Excel)", type=["xlsx"])
+    uploaded_file = st.file_uploader("Upload file komentar (format Excel, CSV, atau Parquet)",
+                                     type=["xlsx", "csv", "parquet"])
     if uploaded_file:
-        df = pd.read_excel(uploaded_file)
+        file_type = detect_file_type(uploaded_file.name)
+
+        with st.expander("⚙️ Pengaturan Pemrosesan"):
+            use_parallel = st.checkbox("Gunakan multi-core (untuk file besar)", value=False)
+            n_jobs = st.number_input("Jumlah worker", min_value=1, max_value=os.cpu_count() or 1,
+                                     value=os.cpu_count() or 1, disabled=not use_parallel)
+            chunk_size = st.number_input("Ukuran chunk (baris)", min_value=100, value=2000, step=100)
+            use_result_store = st.checkbox("Gunakan hasil tersimpan", value=True,
+                                           help="Komentar yang pernah diklasifikasi dengan model & kamus yang sama "
+                                                "diambil dari penyimpanan hasil, tidak diproses ulang.")
+            collect_metrics = st.checkbox("Catat waktu per tahap", value=True,
+                                          help="Menampilkan rincian waktu tiap tahap pipeline setelah klasifikasi.")
+
+        # hanya baca beberapa baris pertama untuk pratinjau; file lengkap dibaca per chunk oleh job
+        df = next(iter_comment_chunks(uploaded_file, file_type, chunk_size=5), pd.DataFrame())
+        uploaded_file.seek(0)
         st.write("📄 Data yang diunggah:")
-        st.dataframe(df.head())
+        st.dataframe(df)
 
         if st.button("🔍 Jalankan Klasifikasi"):
-            with st.spinner("Sedang memproses..."):
-                # --- 1. Preprocessing Awal (cleaned_comment) ---
-                cleaned_df = preprocess_comments(df, alay_dict, stopwords)
-
-                BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-                # --- 2. Load Model dan Transformator ---
-                tfidf = joblib.load(os.path.join(BASE_DIR, "model", "tfidf_vectorizer.joblib"))
-                pca = joblib.load(os.path.join(BASE_DIR, "model", "pca_transformer.joblib"))
-                model = joblib.load(os.path.join(BASE_DIR, "model", "sentiment_model.joblib"))
+            # --- Load Model dan Transformator (digabung jadi satu engine linear sparse) ---
+            # dimuat sekali per proses server, dimuat ulang hanya jika file model berubah
+            engine = registry.get_inference_engine()
+            registry.get_stemmer()
+            job_manager = registry.get_job_manager()
+
+            # file input disalin ke folder job, sehingga job tetap berjalan walau halaman dimuat ulang
+            job_id = uuid.uuid4().hex
+            workdir = job_workdir(job_id)
+            input_path = os.path.join(workdir, f"input.{file_type}")
+            with open(input_path, "wb") as f:
+                f.write(uploaded_file.getvalue())
+
+            # --- 1. Preprocessing Awal, 2. TF-IDF + PCA, 3. Klasifikasi, 4. Mapping Label ---
+            # dijalankan per chunk oleh pool worker server; komentar yang sudah ada di
+            # penyimpanan hasil tidak diproses ulang
+            job_n_jobs = min(int(n_jobs), job_manager.cpu_share()) if use_parallel else 1
+            pipeline = {
+                "alay_dict": alay_dict,
+                "stopwords": stopwords,
+                "engine": engine,
+                "cache": token_cache,
+                "store": registry.get_result_store() if use_result_store else None,
+            }
+            task = functools.partial(
+                run_classification,
+                input_path=input_path, file_type=file_type,
+                result_dir=os.path.join(workdir, "hasil"),
+                pipeline=pipeline, chunk_size=int(chunk_size), n_jobs=job_n_jobs,
+                collect_metrics=collect_metrics,
+                token_cache_path=registry.TOKEN_CACHE_PATH
+            )
+            try:
+                job = job_manager.submit(task, job_id=job_id, total_rows=estimate_rows(input_path, file_type),
+                                         meta={"workdir": workdir})
+            except JobQueueFull as e:
+                shutil.rmtree(workdir, ignore_errors=True)
+                st.warning(str(e))
+            else:
+                # id job disimpan di URL supaya hasilnya bisa dibuka lagi setelah reload
+                st.query_params["job"] = job.id
+                st.rerun()
+
+    # --- Status / hasil job klasifikasi (?job=<id>) ---
+    job_id = st.query_params.get("job")
+    if job_id:
+        job = registry.get_job_manager().get(job_id)
+        if job is None:
+            st.warning("Job klasifikasi tidak ditemukan (sudah kedaluwarsa atau server dimulai ulang).")
+        elif job.status not in FINISHED:
+            show_job_progress(job)
+        else:
+            show_job_result(job)
+        if st.button("✖️ Tutup Job"):
+            del st.query_params["job"]
+            st.rerun()
 
-                # --- 3. Preprocessing Lanjutan (TF-IDF + PCA) ---
-                features = preprocess_features(cleaned_df["cleaned_comment"], tfidf, pca)
+elif selected == "Pemodelan Topik":
+    # halaman pemodelan topik
+    st.title("📚 Hasil Pemodelan Topik (LDA)")
 
-                # --- 4. Klasifikasi ---
-                predictions = classify_comments(features, model)
-                cleaned_df["predicted_label"] = predictions
+    # --- Pemodelan topik dari data terbaru ---
+    # model LDA online + HTML pyLDAvis disimpan per fingerprint korpus; membuka ulang
+    # halaman dengan korpus yang sama langsung memakai hasil yang tersimpan
+    with registry.timed("utils.topics"):
+        from utils.topics import DEFAULT_N_TOPICS, build_topic_model, load_topic_model
 
-                # --- 5. Mapping Label Angka ke Teks (Opsional) ---
-                label_map = {0: "Negatif", 1: "Netral", 2: "Positif"}
-                cleaned_df["label_text"] = cleaned_df["predicted_label"].map(label_map)
+    st.subheader("🔄 Pemodelan Topik dari Data Terbaru")
+    sources = ["Dataset penelitian"]
+    # hasil job yang sudah kedaluwarsa (foldernya terhapus) tidak ditawarkan lagi
+    if os.path.isdir(st.session_state.get("hasil_klasifikasi", "")):
+        sources.append("Hasil klasifikasi terakhir")
+    source = st.radio("Sumber komentar", sources, horizontal=True)
 
-                st.success("Klasifikasi selesai!")
-                st.dataframe(cleaned_df[["comment", "cleaned_comment", "label_text"]])
+    col1, col2 = st.columns(2)
+    topic_sentiment = col1.selectbox("Sentimen", ["Positif", "Netral", "Negatif"])
+    n_topics = int(col2.number_input("Jumlah topik", min_value=2, max_value=20, value=DEFAULT_N_TOPICS))
 
-                # --- 6. Tombol Unduh ---
-                output_buffer = io.BytesIO()
-                cleaned_df.to_excel(output_buffer, index=False, engine='openpyxl')
-                output_buffer.seek(0)
-                
-                st.download_button(
-                    label="⬇️ Unduh Hasil Klasifikasi",
-                    data=output_buffer,
-                    file_name="hasil_klasifikasi.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-                
-elif selected == "Pemodelan Topik":
-    # halaman pemodelan topik
-    st.title("📚 Hasil Pemodelan Topik (LDA)")
-    # konten
+    if source == "Dataset penelitian":
+        cleaned_data_path = os.path.join("data", "after_preprocessing.xlsx")
+        research_df = load_table(cleaned_data_path)
+        topic_texts = research_df.loc[research_df["label"].map(LABEL_MAP) == topic_sentiment, "after"].dropna()
+    else:
+        # dibaca dari potongan parquet hasil job, hanya kolom yang dibutuhkan
+        from utils.export import result_texts
+        topic_texts = result_texts(st.session_state["hasil_klasifikasi"], topic_sentiment).dropna()
+    st.caption(f"{len(topic_texts)} komentar {topic_sentiment.lower()}")
+
+    topic_model = load_topic_model(topic_texts, topic_sentiment, n_topics)
+    if topic_model is None and st.button("🧮 Bangun Model Topik"):
+        try:
+            with st.spinner("Sedang membangun model topik..."):
+                topic_model = build_topic_model(topic_texts, topic_sentiment, n_topics)
+        except ValueError as e:
+            st.warning(str(e))
+
+    if topic_model is not None:
+        if topic_model["incremental"]:
+            st.caption(f"Model diperbarui dengan {topic_model['n_new_documents']} komentar baru "
+                       f"(total {topic_model['n_documents']} komentar).")
+        st.dataframe(pd.DataFrame({
+            "Topik": [f"Topik {i + 1}" for i in range(len(topic_model["topics"]))],
+            "Kata teratas": [", ".join(words) for words in topic_model["topics"]],
+        }), hide_index=True)
+        st.components.v1.html(topic_model["html"], height=800, scrolling=True)
+
+    st.divider()
+    # --- Hasil penelitian (HTML pyLDAvis yang sudah dibuat sebelumnya) ---
     st.subheader("👍🏼 Hasil Pemodelan Topik Komentar Positif")
     html_path = os.path.join("topic_modeling", "output_lda_pos.html")
     if os.path.exists(html_path):
@@ -311,4 +477,12 @@ elif selected == "Pemodelan Topik":
     > **Rekomendasi**: Topik ini cenderung berasal dari persepsi atau spekulasi individu yang sulit dikontrol. 
       Meskipun demikian, pendekatan edukatif secara halus seperti menyisipkan pengingat bahwa kompetisi murni berdasarkan hasil, tanpa intervensi eksternal, bisa membantu menjaga suasana tetap positif.             
 
-    """)
\ No newline at end of file
+    """)
+
+# laporan waktu cold start: import pustaka berat dan muat resource
+with st.sidebar.expander("⏱️ Laporan Startup"):
+    report = registry.startup_report()
+    if report:
+        st.dataframe(pd.DataFrame(report)[["name", "kind", "seconds"]], hide_index=True)
+    else:
+        st.caption("Belum ada resource yang dimuat.")
@@ -0,0 +1,36 @@
+import os
+import random
+import re
+
+import pandas as pd
+
+from utils import registry
+from utils.processing import cleanse_text
+
+DATA_DIR = os.path.join(registry.BASE_DIR, "data")
+
+# Rantai regex asli clean_text (casefolding + 6 langkah cleansing) sebelum digabung
+def original_cleanse(text):
+    text = str(text).lower()
+    text = re.sub(r'http\S+|www\.\S+', ' ', text)
+    text = re.sub(r'<.*?>', ' ', text)
+    text = re.sub(r'@\w+', ' ', text)
+    text = re.sub(r'&quot;|&gt;|&lt;|&amp;', ' ', text)
+    text = re.sub(r'&#39;', '', text)
+    text = re.sub(r'[^0-9a-zA-Z\s]', ' ', text)
+    return text
+
+# Potongan teks yang sering membuat urutan langkah cleansing berpengaruh
+ATOMS = ['a', 'b', 'x', '9', 'http', '://', 'www.', '.', '@', '&', '#39;', '&#39;', '&amp;', 'amp;', '&quot;',
+         'gt;', '<', '>', ' ', '!', '_', 'é', '\n', 'ha', 'aaa', '/', '?', ';']
+
+def test_cleanse_text_matches_original_chain_on_dataset():
+    comments = pd.read_excel(os.path.join(DATA_DIR, "dataset_penelitian.xlsx"))["comment"]
+    for comment in comments:
+        assert cleanse_text(comment).split() == original_cleanse(comment).split(), comment
+
+def test_cleanse_text_matches_original_chain_on_random_text():
+    rng = random.Random(1)
+    for _ in range(20000):
+        text = ''.join(rng.choice(ATOMS) for _ in range(rng.randint(0, 12)))
+        assert cleanse_text(text).split() == original_cleanse(text).split(), text
@@ -0,0 +1,67 @@
+import os
+
+import joblib
+import pandas as pd
+import pytest
+
+from utils import registry
+from utils.inference import FusedLinearClassifier
+
+DATA_DIR = os.path.join(registry.BASE_DIR, "data")
+
+# Artefak PCA + model tidak ikut di repo, jadi reducer dan model linear kecil dilatih
+# ulang dari TF-IDF bawaan pada sebagian data penelitian; jalur yang diuji sama
+SAMPLE_SIZE = 1500
+
+@pytest.fixture(scope="module")
+def cleaned_data():
+    df = pd.read_excel(os.path.join(DATA_DIR, "after_preprocessing.xlsx"))
+    df = df.dropna(subset=["label"]).sample(n=SAMPLE_SIZE, random_state=0)
+    return df["after"].fillna("").astype(str).reset_index(drop=True), df["label"].to_numpy()
+
+@pytest.fixture(scope="module")
+def tfidf():
+    return joblib.load(registry.TFIDF_PATH)
+
+def fit_artifacts(tfidf, texts, labels, whiten=False):
+    from sklearn.decomposition import PCA
+    from sklearn.linear_model import LogisticRegression
+
+    pca = PCA(n_components=20, whiten=whiten, random_state=0)
+    reduced = pca.fit_transform(tfidf.transform(texts).toarray())
+    model = LogisticRegression(max_iter=1000).fit(reduced, labels)
+    return FusedLinearClassifier.from_artifacts(tfidf, pca, model), pca, model
+
+@pytest.mark.parametrize("whiten", [False, True])
+def test_fused_engine_matches_original_pipeline(tfidf, cleaned_data, whiten):
+    from utils.inference import check_equivalence
+
+    texts, labels = cleaned_data
+    engine, pca, model = fit_artifacts(tfidf, texts, labels, whiten=whiten)
+    result = check_equivalence(engine, texts, pca, model)
+    assert result["within_tolerance"], result
+    assert result["label_agreement"] == 1.0, result
+
+def test_token_index_matches_tfidf_transform(tfidf, cleaned_data):
+    from utils.inference import check_token_index
+
+    texts, labels = cleaned_data
+    engine = fit_artifacts(tfidf, texts, labels)[0]
+    result = check_token_index(engine, texts)
+    assert result["within_tolerance"], result
+    assert result["label_agreement"] == 1.0, result
+
+def test_token_index_memo_is_bounded_and_not_pickled(tfidf, cleaned_data):
+    import pickle
+
+    from utils.inference import TfidfTokenIndex
+
+    texts = cleaned_data[0]
+    index = TfidfTokenIndex(tfidf, maxsize=50)
+    expected = [index.encode(text.split(" ")) for text in texts[:200]]
+    assert len(index._ids) == 50
+
+    copy = pickle.loads(pickle.dumps(index))
+    assert len(copy._ids) == 0
+    for text, ids in zip(texts[:200], expected):
+        assert copy.encode(text.split(" ")).tolist() == ids.tolist()
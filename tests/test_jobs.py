@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import registry
+from utils.jobs import CANCELLED, DONE, FINISHED, JobManager, job_workdir, run_classification
+from utils.token_cache import TokenCache
+
+def wait_finished(job, timeout=30):
+    deadline = time.monotonic() + timeout
+    while job.status not in FINISHED:
+        assert time.monotonic() < deadline, f"job {job.id} tidak selesai ({job.status})"
+        time.sleep(0.01)
+
+@pytest.fixture
+def manager(tmp_path):
+    job_manager = JobManager(max_workers=1, max_queued=2, job_dir=str(tmp_path / "jobs"))
+    yield job_manager
+    job_manager._executor.shutdown(wait=True)
+
+def test_cancel_stops_running_job_and_skips_queued_job(manager):
+    started = threading.Event()
+    ran = []
+
+    def endless(job):
+        started.set()
+        rows = 0
+        while True:
+            rows += 1
+            job.update(rows)
+            time.sleep(0.001)
+
+    running = manager.submit(endless)
+    queued = manager.submit(lambda job: ran.append(job.id))
+    assert started.wait(5)
+
+    queued.cancel()
+    running.cancel()
+    wait_finished(running)
+    wait_finished(queued)
+    assert running.status == CANCELLED and running.rows_done > 0
+    assert queued.status == CANCELLED and ran == []
+
+class ConstantEngine:
+    classes_ = np.array([0, 1, 2])
+    token_index = None
+
+    def predict(self, texts, metrics=None):
+        return np.ones(len(texts), dtype=int)
+
+def test_cancelled_classification_removes_partial_results(manager, tmp_path):
+    input_path = tmp_path / "komentar.csv"
+    pd.DataFrame({"comment": [f"acara keren {i}" for i in range(50)]}).to_csv(input_path, index=False)
+    result_dir = str(tmp_path / "hasil")
+    pipeline = {"alay_dict": registry.get_alay_dict(), "stopwords": registry.get_stopwords(),
+                "engine": ConstantEngine(), "cache": TokenCache()}
+
+    def task(job):
+        job.cancel()
+        return run_classification(job, str(input_path), "csv", result_dir, pipeline, chunk_size=10)
+
+    job = manager.submit(task)
+    wait_finished(job)
+    assert job.status == CANCELLED
+    assert job.rows_done == 10
+    assert not os.path.exists(result_dir)
+
+def test_classification_job_writes_result_parts(manager, tmp_path):
+    input_path = tmp_path / "komentar.csv"
+    pd.DataFrame({"comment": [f"acara keren {i}" for i in range(25)]}).to_csv(input_path, index=False)
+    pipeline = {"alay_dict": registry.get_alay_dict(), "stopwords": registry.get_stopwords(),
+                "engine": ConstantEngine(), "cache": TokenCache()}
+
+    job = manager.submit(lambda job: run_classification(job, str(input_path), "csv", str(tmp_path / "hasil"),
+                                                        pipeline, chunk_size=10, keep_rows=5))
+    wait_finished(job)
+    assert job.status == DONE, job.error
+    assert job.result["total_rows"] == 25 and len(job.result["rows"]) == 5
+    assert len(os.listdir(tmp_path / "hasil")) == 3
+
+def test_cleanup_removes_orphaned_job_folders(tmp_path):
+    job_dir = str(tmp_path / "jobs")
+    stale = job_workdir("lama", job_dir)
+    with open(os.path.join(stale, "input.csv"), "w", encoding="utf-8") as f:
+        f.write("comment\n")
+    old = time.time() - 2 * 24 * 60 * 60
+    for path in (os.path.join(stale, "input.csv"), stale):
+        os.utime(path, (old, old))
+    fresh = job_workdir("baru", job_dir)
+
+    job_manager = JobManager(max_workers=1, job_dir=job_dir)
+    job_manager._executor.shutdown()
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import registry
+from utils.result_store import ResultStore, comment_hash
+from utils.streaming import classify_chunk
+
+@pytest.fixture
+def store(tmp_path):
+    result_store = ResultStore(str(tmp_path / "results.sqlite3"), "a" * 64)
+    yield result_store
+    result_store.close()
+
+def test_lookup_returns_stored_results_across_batches(store):
+    comments = [f"komentar {i}" for i in range(1200)]
+    store.store((comment_hash(comment), f"bersih {i}", np.int64(i % 3)) for i, comment in enumerate(comments))
+
+    hashes = [comment_hash(comment) for comment in comments[:1100]] + [comment_hash("belum ada")]
+    found = store.lookup(hashes + hashes[:10])
+    assert len(found) == 1100
+    assert found[comment_hash("komentar 1099")] == ("bersih 1099", 1099 % 3)
+    assert comment_hash("belum ada") not in found
+    # hash duplikat dihitung sekali
+    assert store.stats()["hits"] == 1100 and store.stats()["misses"] == 1
+
+def test_other_fingerprints_are_not_read_and_pruned(store):
+    store.store([(comment_hash("keren"), "keren", 2)])
+    other = ResultStore(store.path, "b" * 64)
+    try:
+        assert other.lookup([comment_hash("keren")]) == {}
+        assert other.prune() == 1
+    finally:
+        other.close()
+    assert store.lookup([comment_hash("keren")]) == {}
+
+# Engine tiruan: mencatat teks yang benar-benar diklasifikasi
+class RecordingEngine:
+    classes_ = np.array([0, 1, 2])
+    token_index = None
+
+    def __init__(self):
+        self.seen = []
+
+    def predict(self, texts, metrics=None):
+        self.seen.extend(texts)
+        return np.array([len(text) % 3 for text in texts])
+
+def test_classify_chunk_only_processes_comments_missing_from_store(store):
+    engine = RecordingEngine()
+    alay_dict, stopwords = registry.get_alay_dict(), registry.get_stopwords()
+
+    first = classify_chunk(pd.DataFrame({"comment": ["acaranya keren", "jelek banget"]}),
+                           alay_dict, stopwords, engine, store=store)
+    assert len(engine.seen) == 2
+
+    second = classify_chunk(pd.DataFrame({"comment": ["jelek banget", "lucu sekali", "acaranya keren"]}),
+                            alay_dict, stopwords, engine, store=store)
+    assert len(engine.seen) == 3
+    assert second["cleaned_comment"].tolist() == [first["cleaned_comment"][1], engine.seen[-1],
+                                                  first["cleaned_comment"][0]]
+    assert second["predicted_label"].tolist()[::2] == first["predicted_label"].tolist()[::-1]
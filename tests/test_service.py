@@ -0,0 +1,58 @@
+import http.client
+import json
+import threading
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from utils.service import MAX_BODY_BYTES, ClassificationHandler
+
+# Batcher tiruan: hasil langsung tersedia tanpa memuat model
+class EchoBatcher:
+    def submit(self, comment):
+        future = Future()
+        future.set_result({"comment": comment})
+        return future
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (ClassificationHandler,), {"batcher": EchoBatcher()})
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server.server_address
+    http_server.shutdown()
+    http_server.server_close()
+
+def post(address, body, headers):
+    conn = http.client.HTTPConnection(*address, timeout=5)
+    try:
+        conn.putrequest("POST", "/classify", skip_accept_encoding=True)
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.endheaders(body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+def test_classify_accepts_valid_body(server):
+    body = json.dumps({"comments": ["keren", "jelek"]}).encode("utf-8")
+    status, payload = post(server, body, {"Content-Length": str(len(body))})
+    assert status == 200
+    assert payload == {"results": [{"comment": "keren"}, {"comment": "jelek"}]}
+
+@pytest.mark.parametrize("headers", [{}, {"Content-Length": "abc"}, {"Content-Length": "-1"}])
+def test_classify_rejects_missing_or_invalid_content_length(server, headers):
+    status, payload = post(server, b"", headers)
+    assert status == 400, payload
+
+def test_classify_rejects_oversized_body(server):
+    status, payload = post(server, b"", {"Content-Length": str(MAX_BODY_BYTES + 1)})
+    assert status == 413, payload
+
+def test_classify_rejects_non_object_json(server):
+    body = b"[1, 2]"
+    status, payload = post(server, body, {"Content-Length": str(len(body))})
+    assert status == 400, payload
@@ -0,0 +1,49 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.streaming import ParquetStreamWriter, estimate_rows, iter_csv_chunks, unify_schemas
+
+def test_unify_schemas_widens_int_to_float_and_conflicts_to_string():
+    schemas = [
+        pa.schema([("likeCount", pa.int64()), ("username", pa.null()), ("extra", pa.int64())]),
+        pa.schema([("likeCount", pa.float64()), ("username", pa.string()), ("extra", pa.string())]),
+    ]
+    unified = unify_schemas(schemas, ["likeCount", "username", "extra"])
+    assert unified.types == [pa.float64(), pa.string(), pa.string()]
+
+def test_parquet_writer_accepts_type_changes_in_later_chunks(tmp_path):
+    source = tmp_path / "komentar.csv"
+    rows = [f"a{i},{i},\n" for i in range(3)] + [f"b{i},{i}.5,x\n" for i in range(3)] + ["c,banyak,1\n"]
+    source.write_text("comment,likeCount,extra\n" + "".join(rows), encoding="utf-8")
+
+    target = tmp_path / "hasil.parquet"
+    writer = ParquetStreamWriter(str(target))
+    for chunk in iter_csv_chunks(str(source), chunk_size=3):
+        writer.write(chunk)
+    writer.close()
+
+    result = pd.read_parquet(target)
+    assert pq.read_schema(target).field("likeCount").type == pa.string()
+    assert result["likeCount"].tolist() == ["0", "1", "2", "0.5", "1.5", "2.5", "banyak"]
+    assert result["comment"].tolist() == ["a0", "a1", "a2", "b0", "b1", "b2", "c"]
+    # potongan sementara dihapus setelah close
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["hasil.parquet", "komentar.csv"]
+
+def test_parquet_writer_widens_int_column_to_float(tmp_path):
+    target = tmp_path / "hasil.parquet"
+    writer = ParquetStreamWriter(str(target))
+    writer.write(pd.DataFrame({"comment": ["a", "b"], "likeCount": [1, 2]}))
+    writer.write(pd.DataFrame({"comment": ["c"], "likeCount": [2.5]}))
+    writer.close()
+
+    assert pq.read_schema(target).field("likeCount").type == pa.float64()
+    assert pd.read_parquet(target)["likeCount"].tolist() == [1.0, 2.0, 2.5]
+
+def test_estimate_rows_counts_csv_records_with_embedded_line_breaks(tmp_path):
+    source = tmp_path / "komentar.csv"
+    df = pd.DataFrame({"comment": ["baris\nbaru\r\nlagi", "biasa", 'kutip "ganda"\n'], "likeCount": [1, 2, 3]})
+    df.to_csv(source, index=False)
+    with open(source, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert estimate_rows(str(source), "csv") == len(pd.read_csv(source)) == 3
@@ -0,0 +1,97 @@
+import glob
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from utils.metrics import NULL_METRICS
+from utils.snapshot import atomic_write, to_columnar
+from utils.streaming import STREAM_WRITERS, ParquetStreamWriter, unify_schemas
+
+# Lapisan ekspor hasil klasifikasi. Hasil job disimpan sebagai potongan parquet
+# (satu file per chunk); file unduhan baru dibuat saat diminta, dengan format
+# dan subset kolom pilihan pengguna, dan ditulis chunk demi chunk.
+
+EXPORT_FORMATS = ["xlsx", "csv", "parquet"]
+
+class ResultPartsWriter:
+    # Antarmuka sama dengan penulis di STREAM_WRITERS; target berupa folder.
+    # bytes_written = total ukuran potongan yang sudah ditulis (metrik run)
+    def __init__(self, target):
+        self.target = target
+        self.parts = 0
+        self.bytes_written = 0
+        os.makedirs(target, exist_ok=True)
+
+    def write(self, df):
+        path = os.path.join(self.target, f"part-{self.parts:05d}.parquet")
+        to_columnar(df.copy()).to_parquet(path, index=False)
+        self.parts += 1
+        self.bytes_written += os.path.getsize(path)
+
+    def close(self):
+        pass
+
+def _part_paths(result_dir):
+    return sorted(glob.glob(os.path.join(result_dir, "part-*.parquet")))
+
+def result_columns(result_dir):
+    import pyarrow.parquet as pq
+
+    parts = _part_paths(result_dir)
+    return pq.read_schema(parts[0]).names if parts else []
+
+def iter_result_parts(result_dir, columns=None):
+    for path in _part_paths(result_dir):
+        yield pd.read_parquet(path, columns=columns)
+
+# cleaned_comment untuk satu sentimen (korpus halaman Pemodelan Topik), dibaca per
+# potongan hanya dengan dua kolom yang dibutuhkan
+def result_texts(result_dir, label_text):
+    texts = [part.loc[part["label_text"] == label_text, "cleaned_comment"]
+             for part in iter_result_parts(result_dir, ["cleaned_comment", "label_text"])]
+    return pd.concat(texts, ignore_index=True) if texts else pd.Series(dtype=object)
+
+# Skema gabungan semua potongan hasil (lihat unify_schemas)
+def _unified_schema(result_dir, columns):
+    import pyarrow.parquet as pq
+
+    return unify_schemas([pq.read_schema(path) for path in _part_paths(result_dir)], columns)
+
+# Tulis file ekspor; hasil disimpan di folder hasil dan dipakai ulang untuk
+# permintaan berikutnya dengan format + kolom yang sama. Waktu dan ukuran file
+# ekspor yang baru dibuat dicatat ke metrics (tahap "ekspor").
+def export_result(result_dir, file_format, columns=None, metrics=None):
+    metrics = metrics or NULL_METRICS
+    if file_format not in STREAM_WRITERS:
+        raise ValueError(f"Format ekspor '{file_format}' tidak didukung. Gunakan {', '.join(EXPORT_FORMATS)}.")
+    columns = list(columns or result_columns(result_dir))
+    key = hashlib.sha256(json.dumps(columns).encode("utf-8")).hexdigest()[:16]
+    export_path = os.path.join(result_dir, f"export-{key}.{file_format}")
+    if os.path.exists(export_path):
+        return export_path
+
+    def write(tmp_path):
+        if file_format == "parquet":
+            writer = ParquetStreamWriter(tmp_path, schema=_unified_schema(result_dir, columns))
+        else:
+            writer = STREAM_WRITERS[file_format](tmp_path)
+        wrote = False
+        for part in iter_result_parts(result_dir, columns):
+            writer.write(part)
+            wrote = True
+        if not wrote:
+            writer.write(pd.DataFrame(columns=columns))
+        writer.close()
+
+    # Beberapa sesi bisa mengekspor hasil yang sama bersamaan; tiap sesi menulis
+    # ke file temporernya sendiri
+    with metrics.stage("ekspor"):
+        atomic_write(export_path, write, suffix=f".{file_format}.tmp")
+    metrics.count("bytes_exported", os.path.getsize(export_path))
+    return export_path
+
+def export_bytes(result_dir, file_format, columns=None, metrics=None):
+    with open(export_result(result_dir, file_format, columns, metrics), "rb") as f:
+        return f.read()
@@ -0,0 +1,220 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+
+from utils.metrics import NULL_METRICS
+from utils.processing import load_models
+
+# Toleransi selisih skor keputusan antara engine gabungan dan jalur
+# preprocess_features -> classify_comments (hanya beda pembulatan floating point)
+DECISION_TOLERANCE = 1e-6
+
+# Indeks vocabulary TF-IDF untuk jalur tokenize-once: kata hasil preprocessing
+# langsung dipetakan ke id kolom TF-IDF saat cleaning, lalu matriks TF-IDF dirakit
+# dari array id tanpa menganalisis ulang string cleaned_comment. Token di luar
+# vocabulary dibuang saat itu juga. Hanya untuk vectorizer word unigram standar;
+# konfigurasi lain memakai tfidf.transform seperti biasa.
+class TfidfTokenIndex:
+    def __init__(self, tfidf, maxsize=200_000):
+        self.tfidf = tfidf
+        self.vocabulary = tfidf.vocabulary_
+        self.idf = np.asarray(tfidf.idf_, dtype=np.float64) if getattr(tfidf, "use_idf", True) else None
+        self.maxsize = maxsize
+        self._analyzer = tfidf.build_analyzer()
+        # LRU kata -> (id token dalam vocabulary, jumlah token hasil analyzer);
+        # dipakai bersama oleh beberapa thread job, jadi dibatasi dan dijaga lock
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supports(tfidf):
+        return (getattr(tfidf, "analyzer", None) == "word" and tuple(getattr(tfidf, "ngram_range", ())) == (1, 1)
+                and getattr(tfidf, "tokenizer", None) is None and getattr(tfidf, "preprocessor", None) is None
+                and hasattr(tfidf, "vocabulary_") and hasattr(tfidf, "idf_"))
+
+    # Analyzer TF-IDF tidak pernah menggabungkan token melewati spasi, jadi
+    # memetakan kata satu per satu sama dengan menganalisis ' '.join(kata).
+    # Lock diambil sekali per dokumen, bukan per kata.
+    def _word_ids(self, words):
+        entries = []
+        with self._lock:
+            for word in words:
+                entry = self._ids.get(word)
+                if entry is None:
+                    tokens = self._analyzer(word)
+                    ids = tuple(self.vocabulary[token] for token in tokens if token in self.vocabulary)
+                    entry = self._ids[word] = (ids, len(tokens))
+                    if len(self._ids) > self.maxsize:
+                        self._ids.popitem(last=False)
+                else:
+                    self._ids.move_to_end(word)
+                entries.append(entry)
+        return entries
+
+    def encode(self, words):
+        ids = []
+        for word_ids, _ in self._word_ids(words):
+            ids.extend(word_ids)
+        return np.asarray(ids, dtype=np.int32)
+
+    # Jumlah token hasil analyzer TF-IDF (termasuk yang di luar vocabulary)
+    def count_tokens(self, words):
+        return sum(n_tokens for _, n_tokens in self._word_ids(words))
+
+    # Rakit matriks TF-IDF (CSR) dari array id per dokumen, setara tfidf.transform
+    def transform(self, token_ids):
+        lengths = np.fromiter((len(ids) for ids in token_ids), dtype=np.int64, count=len(token_ids))
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.concatenate(token_ids) if len(token_ids) else np.empty(0, dtype=np.int32)
+        data = np.ones(len(indices), dtype=np.float64)
+
+        counts = sp.csr_matrix((data, indices, indptr), shape=(len(lengths), len(self.vocabulary)))
+        counts.sum_duplicates()
+        if self.tfidf.binary:
+            counts.data.fill(1.0)
+        if self.tfidf.sublinear_tf:
+            np.log(counts.data, counts.data)
+            counts.data += 1.0
+        if self.idf is not None:
+            counts.data *= self.idf[counts.indices]
+        if self.tfidf.norm:
+            from sklearn.preprocessing import normalize
+            counts = normalize(counts, norm=self.tfidf.norm, copy=False)
+        return counts.astype(self.tfidf.dtype, copy=False)
+
+    # Analyzer (closure sklearn) dan lock dibangun ulang setelah dikirim ke worker
+    # proses; isi memo tidak ikut dikirim, tiap worker mengisi memonya sendiri
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_analyzer"], state["_lock"]
+        state["_ids"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._analyzer = self.tfidf.build_analyzer()
+        self._lock = threading.Lock()
+
+# Engine inferensi gabungan TF-IDF -> PCA -> klasifikasi linear.
+# PCA dan Logistic Regression sama-sama linear, sehingga keduanya bisa dilipat
+# menjadi satu proyeksi (vocab x kelas) yang langsung dikalikan dengan matriks
+# TF-IDF sparse. Dimensi vocabulary tidak pernah diubah menjadi array dense.
+class FusedLinearClassifier:
+    def __init__(self, tfidf, weights, bias, classes):
+        self.tfidf = tfidf
+        self.weights = weights
+        self.bias = bias
+        self.classes_ = classes
+        self.token_index = TfidfTokenIndex(tfidf) if TfidfTokenIndex.supports(tfidf) else None
+
+    @classmethod
+    def from_artifacts(cls, tfidf, pca, model):
+        if not hasattr(pca, "components_"):
+            raise TypeError(f"Reducer {type(pca).__name__} tidak linear (tidak punya components_).")
+        if not hasattr(model, "coef_") or not hasattr(model, "intercept_"):
+            raise TypeError(f"Model {type(model).__name__} bukan klasifikasi linear (tidak punya coef_).")
+
+        # Proyeksi PCA: (X - mean_) @ components_.T, dibagi sqrt(explained_variance_) jika whiten
+        components = np.asarray(pca.components_, dtype=np.float64)
+        if getattr(pca, "whiten", False):
+            components = components / np.sqrt(np.asarray(pca.explained_variance_, dtype=np.float64))[:, None]
+
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        intercept = np.asarray(model.intercept_, dtype=np.float64)
+
+        # Skor keputusan: X @ (components.T @ coef.T) + (intercept - mean_ @ W)
+        weights = components.T @ coef.T
+        bias = intercept.copy()
+        mean = getattr(pca, "mean_", None)
+        if mean is not None:
+            bias -= np.asarray(mean, dtype=np.float64) @ weights
+
+        return cls(tfidf, weights, bias, np.asarray(model.classes_))
+
+    def decision_function_from_tfidf(self, tfidf_features):
+        # sparse (n_docs x vocab) @ dense (vocab x kelas) -> dense (n_docs x kelas)
+        scores = np.asarray(tfidf_features @ self.weights) + self.bias
+        if scores.shape[1] == 1:
+            return scores.ravel()
+        return scores
+
+    def decision_function(self, text_series):
+        return self.decision_function_from_tfidf(self.tfidf.transform(text_series))
+
+    def predict_from_tfidf(self, tfidf_features):
+        scores = self.decision_function_from_tfidf(tfidf_features)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def predict(self, text_series, metrics=None):
+        metrics = metrics or NULL_METRICS
+        with metrics.stage("tfidf"):
+            tfidf_features = self.tfidf.transform(text_series)
+        if metrics.enabled:
+            self._count_vocabulary(text_series, metrics)
+        with metrics.stage("pca_prediksi"):
+            return self.predict_from_tfidf(tfidf_features)
+
+    # Jalur tokenize-once: token_ids dari utils.processing.clean_texts_with_ids(..., engine.token_index)
+    def predict_token_ids(self, token_ids, metrics=None):
+        metrics = metrics or NULL_METRICS
+        with metrics.stage("tfidf"):
+            tfidf_features = self.token_index.transform(token_ids)
+        with metrics.stage("pca_prediksi"):
+            return self.predict_from_tfidf(tfidf_features)
+
+    # Hitung token di luar vocabulary TF-IDF (hanya saat metrik aktif, karena butuh tokenisasi ulang)
+    def _count_vocabulary(self, text_series, metrics):
+        analyzer = self.tfidf.build_analyzer()
+        vocabulary = self.tfidf.vocabulary_
+        total = oov = 0
+        for text in text_series:
+            tokens = analyzer(text)
+            total += len(tokens)
+            oov += sum(1 for token in tokens if token not in vocabulary)
+        metrics.count("vectorized_tokens", total)
+        metrics.count("oov_tokens", oov)
+
+# Bangun engine dari artefak joblib yang tersimpan
+def load_inference_engine(tfidf_path, pca_path, model_path):
+    tfidf, pca, model = load_models(tfidf_path, pca_path, model_path)
+    return FusedLinearClassifier.from_artifacts(tfidf, pca, model)
+
+# Bandingkan engine dengan jalur asli (TF-IDF dense -> PCA -> model) pada sampel teks.
+# Berguna untuk memeriksa artefak baru sebelum dipakai.
+def check_equivalence(engine, text_series, pca, model, tolerance=DECISION_TOLERANCE):
+    tfidf_features = engine.tfidf.transform(text_series)
+    reduced_features = pca.transform(tfidf_features.toarray())
+
+    expected_scores = model.decision_function(reduced_features)
+    fused_scores = engine.decision_function_from_tfidf(tfidf_features)
+    max_abs_diff = float(np.max(np.abs(expected_scores - fused_scores))) if len(fused_scores) else 0.0
+
+    expected_labels = model.predict(reduced_features)
+    fused_labels = engine.predict_from_tfidf(tfidf_features)
+    return {
+        "max_abs_diff": max_abs_diff,
+        "within_tolerance": max_abs_diff <= tolerance,
+        "label_agreement": float(np.mean(expected_labels == fused_labels)) if len(fused_labels) else 1.0,
+    }
+
+# Bandingkan matriks TF-IDF hasil indeks token dengan tfidf.transform pada teks hasil preprocessing
+def check_token_index(engine, cleaned_texts, tolerance=DECISION_TOLERANCE):
+    if engine.token_index is None:
+        raise ValueError("Konfigurasi TF-IDF tidak mendukung jalur indeks token.")
+    cleaned_texts = [str(text) for text in cleaned_texts]
+    expected = engine.tfidf.transform(cleaned_texts)
+    token_ids = [engine.token_index.encode(text.split(" ")) for text in cleaned_texts]
+    indexed = engine.token_index.transform(token_ids)
+    diff = abs(expected - indexed)
+    max_abs_diff = float(diff.max()) if diff.nnz else 0.0
+    return {
+        "max_abs_diff": max_abs_diff,
+        "within_tolerance": max_abs_diff <= tolerance,
+        "label_agreement": float(np.mean(engine.predict_from_tfidf(expected) == engine.predict_from_tfidf(indexed)))
+                           if len(cleaned_texts) else 1.0,
+    }
@@ -0,0 +1,246 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.registry import CACHE_DIR
+
+# Eksekusi klasifikasi di latar belakang: job diproses per chunk oleh pool worker
+# terbatas milik proses server, sehingga halaman Streamlit tidak membeku dan
+# beberapa pengguna tidak berebut CPU. Status job disimpan di memori proses,
+# file input/hasil di JOB_DIR, jadi hasil tetap bisa diambil setelah reload halaman.
+
+JOB_DIR = os.path.join(CACHE_DIR, "jobs")
+
+# Batas per server: job yang berjalan bersamaan + job yang boleh menunggu di antrean
+MAX_RUNNING_JOBS = int(os.environ.get("SATM_MAX_RUNNING_JOBS", 2))
+MAX_QUEUED_JOBS = int(os.environ.get("SATM_MAX_QUEUED_JOBS", 8))
+
+# Job yang sudah selesai (beserta filenya) dihapus setelah JOB_TTL_SECONDS
+JOB_TTL_SECONDS = 24 * 60 * 60
+
+PREVIEW_ROWS = 100
+
+QUEUED, RUNNING, DONE, CANCELLED, FAILED = "queued", "running", "done", "cancelled", "failed"
+FINISHED = {DONE, CANCELLED, FAILED}
+
+class JobQueueFull(RuntimeError):
+    pass
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, job_id, total_rows=None, meta=None):
+        self.id = job_id
+        self.status = QUEUED
+        self.total_rows = total_rows
+        self.rows_done = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.result = None
+        self.meta = meta or {}
+        self._cancel = threading.Event()
+        self._future = None
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    # Dipanggil task setiap chunk selesai; sekaligus titik pembatalan
+    def update(self, rows_done):
+        self.rows_done = rows_done
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+        # job yang masih di antrean langsung dibatalkan tanpa pernah berjalan
+        if self._future is not None and self._future.cancel():
+            self.status = CANCELLED
+            self.finished_at = time.time()
+
+    # total_rows hanya perkiraan; job yang selesai selalu 100%
+    def progress(self):
+        if self.status == DONE:
+            return 1.0
+        if not self.total_rows:
+            return None
+        return min(self.rows_done / self.total_rows, 1.0)
+
+    def eta_seconds(self):
+        if self.status != RUNNING or not self.total_rows or not self.rows_done:
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = max(self.total_rows - self.rows_done, 0)
+        return remaining * elapsed / self.rows_done
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "rows_done": self.rows_done,
+            "total_rows": self.total_rows,
+            "progress": self.progress(),
+            "eta_seconds": self.eta_seconds(),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+class JobManager:
+    def __init__(self, max_workers=MAX_RUNNING_JOBS, max_queued=MAX_QUEUED_JOBS, job_dir=JOB_DIR):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.job_dir = job_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # folder job dari proses server sebelumnya (mis. setelah restart) ikut dibersihkan
+        self.cleanup()
+
+    # Jumlah core yang boleh dipakai satu job supaya job yang berjalan bersamaan
+    # tidak melebihi jumlah core server
+    def cpu_share(self):
+        return max(1, (os.cpu_count() or 1) // self.max_workers)
+
+    def active_jobs(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status not in FINISHED)
+
+    # task(job) dijalankan di thread worker; nilai kembaliannya menjadi job.result
+    def submit(self, task, job_id=None, total_rows=None, meta=None):
+        self.cleanup()
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.status not in FINISHED)
+            if active >= self.max_workers + self.max_queued:
+                raise JobQueueFull(f"Antrean klasifikasi penuh ({active} job aktif). Coba lagi beberapa saat lagi.")
+            job = Job(job_id or uuid.uuid4().hex, total_rows, meta)
+            self._jobs[job.id] = job
+            job._future = self._executor.submit(self._run, job, task)
+        return job
+
+    def _run(self, job, task):
+        if job.cancel_requested:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = task(job)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    # Hapus job selesai yang sudah kedaluwarsa beserta folder kerjanya, lalu folder
+    # di job_dir yang tidak dikenal proses ini (sisa server sebelumnya) dan tidak
+    # diubah selama ttl detik
+    def cleanup(self, ttl=JOB_TTL_SECONDS):
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.status in FINISHED and job.finished_at and now - job.finished_at > ttl]
+            for job in expired:
+                del self._jobs[job.id]
+            known = set(self._jobs)
+        for job in expired:
+            workdir = job.meta.get("workdir")
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        orphaned = 0
+        if os.path.isdir(self.job_dir):
+            for entry in os.scandir(self.job_dir):
+                if entry.name in known or not entry.is_dir():
+                    continue
+                if now - _latest_mtime(entry.path) > ttl:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    orphaned += 1
+        return len(expired) + orphaned
+
+# Waktu perubahan terakhir sebuah folder job beserta isinya
+def _latest_mtime(path):
+    latest = os.path.getmtime(path)
+    for root, _, files in os.walk(path):
+        for name in [root] + [os.path.join(root, file) for file in files]:
+            try:
+                latest = max(latest, os.path.getmtime(name))
+            except FileNotFoundError:
+                pass
+    return latest
+
+def job_workdir(job_id, job_dir=JOB_DIR):
+    workdir = os.path.join(job_dir, job_id)
+    os.makedirs(workdir, exist_ok=True)
+    return workdir
+
+# --- Task klasifikasi ---
+# pipeline: dict seperti utils.service.load_pipeline (alay_dict, stopwords, engine, cache, store).
+# Hanya keep_rows baris pertama (pratinjau) yang disimpan di memori. Hasil lengkap ditulis ke
+# result_dir sebagai potongan parquet; file unduhan dan korpus pemodelan topik dibaca
+# belakangan dari sana (utils.export), sehingga memori job tidak bergantung pada ukuran file.
+def run_classification(job, input_path, file_type, result_dir, pipeline, chunk_size, n_jobs=1,
+                       keep_rows=PREVIEW_ROWS, collect_metrics=True, token_cache_path=None):
+    from utils.export import ResultPartsWriter
+    from utils.metrics import RunMetrics
+    from utils.streaming import classify_stream, iter_comment_chunks, read_chunk_rows
+    from utils.wordclouds import merge_term_frequencies, term_frequencies
+
+    metrics = RunMetrics() if collect_metrics else None
+    read_rows = read_chunk_rows(chunk_size, n_jobs)
+    kept = []
+    term_index = {}
+
+    def on_chunk(result, total_rows):
+        merge_term_frequencies(term_index, term_frequencies(result["cleaned_comment"], result["label_text"]))
+        kept_rows = sum(len(part) for part in kept)
+        if kept_rows < keep_rows:
+            kept.append(result.head(keep_rows - kept_rows))
+        job.update(total_rows)
+
+    try:
+        total_rows = classify_stream(
+            iter_comment_chunks(input_path, file_type, chunk_size=read_rows), ResultPartsWriter(result_dir),
+            pipeline["alay_dict"], pipeline["stopwords"], pipeline["engine"],
+            cache=pipeline["cache"], on_chunk=on_chunk, n_jobs=n_jobs, metrics=metrics, store=pipeline.get("store"),
+            chunk_size=chunk_size
+        )
+    except BaseException:
+        shutil.rmtree(result_dir, ignore_errors=True)
+        raise
+    finally:
+        if token_cache_path:
+            pipeline["cache"].save(token_cache_path)
+
+    store = pipeline.get("store")
+    return {
+        "total_rows": total_rows,
+        "result_dir": result_dir,
+        "rows": pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(),
+        "term_index": term_index,
+        "metrics": metrics.finish() if metrics else None,
+        "token_cache": pipeline["cache"].stats(),
+        "result_store": store.stats() if store is not None else None,
+    }
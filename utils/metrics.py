@@ -0,0 +1,123 @@
+import json
+import re
+import time
+from contextlib import contextmanager, nullcontext
+
+# Instrumentasi ringan per tahap pipeline: waktu per tahap + counter.
+# Fungsi pipeline menerima argumen metrics=None; tanpa metrics dipakai NULL_METRICS
+# yang tidak melakukan apa pun, sehingga jalur normal hampir tanpa overhead.
+
+# Urutan tampilan tahap di panel / ekspor
+STAGE_ORDER = [
+    "result_store", "cleansing", "normalisasi_alay", "hapus_karakter_berulang", "stemming", "stopword_removal",
+    "indeks_token", "tfidf", "pca", "prediksi", "pca_prediksi", "serialisasi_output", "ekspor",
+]
+
+class RunMetrics:
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.started_at = time.time()
+        self.elapsed_seconds = None
+        self._start = time.perf_counter()
+
+    # Tandai akhir run; rows_per_second memakai waktu dinding sejak metrik dibuat
+    def finish(self):
+        self.elapsed_seconds = time.perf_counter() - self._start
+        return self
+
+    def add_time(self, name, seconds, calls=1):
+        stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        stage["seconds"] += seconds
+        stage["calls"] += calls
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other):
+        for name, stage in other.stages.items():
+            self.add_time(name, stage["seconds"], stage["calls"])
+        for name, value in other.counters.items():
+            self.count(name, value)
+
+    def total_seconds(self):
+        return sum(stage["seconds"] for stage in self.stages.values())
+
+    def rows_per_second(self):
+        elapsed = self.elapsed_seconds if self.elapsed_seconds is not None else time.perf_counter() - self._start
+        rows = self.counters.get("rows", 0)
+        return rows / elapsed if elapsed > 0 else 0.0
+
+    def ordered_stages(self):
+        order = {name: i for i, name in enumerate(STAGE_ORDER)}
+        return sorted(self.stages.items(), key=lambda item: (order.get(item[0], len(order)), item[0]))
+
+    def to_dict(self):
+        total = self.total_seconds()
+        return {
+            "started_at": self.started_at,
+            "total_seconds": total,
+            "elapsed_seconds": self.elapsed_seconds,
+            "rows_per_second": self.rows_per_second(),
+            "stages": [
+                {"stage": name, "seconds": stage["seconds"], "calls": stage["calls"],
+                 "share": stage["seconds"] / total if total > 0 else 0.0}
+                for name, stage in self.ordered_stages()
+            ],
+            "counters": dict(self.counters),
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    # Format teks Prometheus (exposition format 0.0.4)
+    def to_prometheus(self, prefix="satm"):
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Waktu kumulatif per tahap pipeline.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        for name, stage in self.ordered_stages():
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {stage["seconds"]:.6f}')
+
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Jumlah pemanggilan per tahap pipeline.",
+            f"# TYPE {prefix}_stage_calls_total counter",
+        ]
+        for name, stage in self.ordered_stages():
+            lines.append(f'{prefix}_stage_calls_total{{stage="{name}"}} {stage["calls"]}')
+
+        for name, value in sorted(self.counters.items()):
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+
+        lines += [
+            f"# TYPE {prefix}_rows_per_second gauge",
+            f"{prefix}_rows_per_second {self.rows_per_second():.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+_NULL_CONTEXT = nullcontext()
+
+class _NullMetrics:
+    enabled = False
+
+    def add_time(self, name, seconds, calls=1):
+        pass
+
+    def stage(self, name):
+        return _NULL_CONTEXT
+
+    def count(self, name, value=1):
+        pass
+
+NULL_METRICS = _NullMetrics()
@@ -1,50 +1,322 @@
 import pandas as pd
 import re
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import joblib
 
-# Inisialisasi Stemmer sekali saja
-factory = StemmerFactory()
-stemmer = factory.create_stemmer()
+from utils.metrics import NULL_METRICS, RunMetrics
 
-def preprocess_comments(df, alay_dict, stopwords):
+# Mapping label angka ke teks
+LABEL_MAP = {0: "Negatif", 1: "Netral", 2: "Positif"}
+
+# Inisialisasi Stemmer sekali saja, baru saat pertama kali dibutuhkan
+# (membangun kamus Sastrawi cukup berat untuk dilakukan saat import)
+stemmer = None
+
+def get_stemmer():
+    global stemmer
+    if stemmer is None:
+        from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+        factory = StemmerFactory()
+        stemmer = factory.create_stemmer()
+    return stemmer
+
+# Pola cleansing gabungan (URL, mention, entitas HTML, tanda baca) dalam satu pass.
+# Urutan alternatif penting: pola yang lebih spesifik harus dicoba lebih dulu.
+# '&' dan '@' dikeluarkan dari kelas tanda baca agar tidak "menelan" awal
+# entitas HTML atau mention, lalu ditangani satu per satu di alternatif terakhir.
+_CLEANSING_PATTERN = re.compile(
+    r'(&#39;)'                      # Karakter spesial (dihapus tanpa spasi)
+    r'|http\S+|www\.\S+'            # URL
+    r'|@\w+'                        # Mention
+    r'|&quot;|&gt;|&lt;|&amp;'       # Entitas HTML
+    r'|[^0-9a-zA-Z\s&@]+|[&@]'      # Tanda baca dan karakter aneh
+)
+
+# Rantai regex asli, dipakai untuk teks yang urutan langkah cleansing-nya
+# bisa memengaruhi hasil (HTML tag, atau mention yang bersinggungan dengan URL)
+_CLEANSING_CHAIN = [
+    (re.compile(r'http\S+|www\.\S+'), ' '),            # Hapus URL
+    (re.compile(r'<.*?>'), ' '),                         # Hapus HTML tag
+    (re.compile(r'@\w+'), ' '),                          # Hapus mention
+    (re.compile(r'&quot;|&gt;|&lt;|&amp;'), ' '),        # Hapus entitas HTML
+    (re.compile(r'&#39;'), ''),                          # Hapus karakter spesial
+    (re.compile(r'[^0-9a-zA-Z\s]'), ' '),                # Hapus tanda baca dan karakter aneh
+]
+
+_REPETITION_PATTERN = re.compile(r'(.)\1{2,}')
+
+def _cleansing_replacement(match):
+    return '' if match.group(1) else ' '
+
+def _needs_full_chain(text):
+    return '<' in text or ('@' in text and ('http' in text or 'www.' in text))
+
+def cleanse_text(text):
+    # Casefolding + cleansing, hasilnya identik dengan rantai regex asli
+    text = str(text).lower()
+    if _needs_full_chain(text):
+        for pattern, replacement in _CLEANSING_CHAIN:
+            text = pattern.sub(replacement, text)
+        return text
+    return _CLEANSING_PATTERN.sub(_cleansing_replacement, text)
+
+# Batas bawah jumlah baris untuk mode paralel; di bawah ini biaya kirim data
+# ke worker (dan start pool pada pemanggilan pertama) lebih besar daripada waktu yang dihemat
+MIN_PARALLEL_ROWS = 5000
+
+# token_index: indeks vocabulary TF-IDF (utils.inference.TfidfTokenIndex). Jika diberikan,
+# kolom "token_ids" berisi array id token per komentar ikut ditambahkan, sehingga
+# matriks TF-IDF bisa dirakit tanpa tokenisasi ulang cleaned_comment.
+def preprocess_comments(df, alay_dict, stopwords, cache=None, n_jobs=1, chunk_size=2000, metrics=None,
+                        token_index=None):
+    metrics = metrics or NULL_METRICS
     df = df.rename(columns=lambda x: x.lower())
     if "comment" not in df.columns:
         raise ValueError("Kolom 'comment' tidak ditemukan pada file yang diunggah.")
     
-    df["cleaned_comment"] = df["comment"].apply(lambda x: clean_text(x, alay_dict, stopwords))
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    n_chunks = -(-len(df) // chunk_size)
+    
+    if n_jobs == 1 or n_chunks < 2 or len(df) < MIN_PARALLEL_ROWS:
+        if token_index is None:
+            cleaned, token_ids = clean_texts(df["comment"].tolist(), alay_dict, stopwords, cache, metrics), None
+        else:
+            cleaned, token_ids = clean_texts_with_ids(df["comment"].tolist(), alay_dict, stopwords, token_index,
+                                                      cache, metrics)
+    else:
+        # waktu per tahap dari worker dijumlahkan (total waktu CPU semua worker)
+        from utils.registry import get_cleaning_pool
+        cleaned, token_ids = get_cleaning_pool().clean(df["comment"].tolist(), alay_dict, stopwords, cache,
+                                                       min(n_jobs, n_chunks), chunk_size, metrics, token_index)
+    df["cleaned_comment"] = pd.Series(cleaned, index=df.index, dtype=object)
+    if token_ids is not None:
+        df["token_ids"] = pd.Series(token_ids, index=df.index, dtype=object)
+    metrics.count("rows", len(df))
     return df
 
-def clean_text(text, alay_dict, stopwords):
-    text = str(text)
+# --- Mode paralel ---
+# State per worker proses: kamus alay, stopwords, cache dan indeks token dikirim
+# sekali saat worker dibuat, stemmer dibuat sekali per worker saat initializer berjalan
+_worker_state = {}
+
+def _init_worker(alay_dict, stopwords, cache, token_index=None):
+    get_stemmer()
+    if cache is not None:
+        cache.hits = cache.misses = 0
+        cache.track_new_entries()
+    _worker_state.update(alay_dict=alay_dict, stopwords=stopwords, cache=cache, token_index=token_index)
+
+def _clean_chunk(texts, collect_metrics, use_token_index):
+    cache = _worker_state["cache"]
+    token_index = _worker_state["token_index"] if use_token_index else None
+    # Metrik per tahap dihitung di worker lalu digabung di proses induk
+    metrics = RunMetrics() if collect_metrics else None
+    if token_index is None:
+        cleaned = clean_texts(texts, _worker_state["alay_dict"], _worker_state["stopwords"], cache, metrics)
+        token_ids = None
+    else:
+        cleaned, token_ids = clean_texts_with_ids(texts, _worker_state["alay_dict"], _worker_state["stopwords"],
+                                                  token_index, cache, metrics)
+    if cache is None:
+        return cleaned, token_ids, [], 0, 0, metrics
+    
+    # Kirim entri baru + selisih hit/miss supaya cache induk ikut terisi
+    hits, misses = cache.hits, cache.misses
+    cache.hits = cache.misses = 0
+    return cleaned, token_ids, cache.pop_new_entries(), hits, misses, metrics
+
+# Konteks proses worker: fork dari proses server yang punya banyak thread
+# (Streamlit, job latar belakang) tidak aman, jadi worker dibuat lewat forkserver/spawn
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+# Process pool seumur proses (dipegang registry): worker dibuat sekali lalu dipakai
+# untuk setiap chunk. Pool hanya dibuat ulang jika dipanggil dengan kamus, cache
+# atau indeks token yang berbeda (mis. kamus dimuat ulang oleh registry).
+class CleaningPool:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._resources = None
+        self._lock = threading.Lock()
+
+    def _executor_for(self, alay_dict, stopwords, cache, token_index):
+        with self._lock:
+            current = self._resources
+            same = current is not None and all(a is b for a, b in zip(current[:3], (alay_dict, stopwords, cache)))
+            if same and (token_index is None or token_index is current[3]):
+                return self._executor
+            
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            # referensi resource disimpan supaya identitasnya tetap valid selama pool hidup
+            self._resources = (alay_dict, stopwords, cache, token_index)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_mp_context(),
+                                                 initializer=_init_worker,
+                                                 initargs=(alay_dict, stopwords, cache, token_index))
+            return self._executor
+
+    # n_jobs membatasi jumlah chunk yang diproses bersamaan untuk satu pemanggilan
+    def clean(self, texts, alay_dict, stopwords, cache, n_jobs, chunk_size, metrics=NULL_METRICS, token_index=None):
+        executor = self._executor_for(alay_dict, stopwords, cache, token_index)
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        
+        cleaned = []
+        token_ids = [] if token_index is not None else None
+        
+        # hasil diambil sesuai urutan chunk supaya urutan output sama dengan input
+        def collect(future):
+            chunk_cleaned, chunk_ids, new_entries, hits, misses, chunk_metrics = future.result()
+            cleaned.extend(chunk_cleaned)
+            if token_ids is not None:
+                token_ids.extend(chunk_ids)
+            if cache is not None:
+                cache.merge(new_entries, hits, misses)
+            if chunk_metrics is not None:
+                metrics.merge(chunk_metrics)
+        
+        pending = deque()
+        for chunk in chunks:
+            if len(pending) >= n_jobs:
+                collect(pending.popleft())
+            pending.append(executor.submit(_clean_chunk, chunk, metrics.enabled, token_index is not None))
+        while pending:
+            collect(pending.popleft())
+        return cleaned, token_ids
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = self._resources = None
+
+# Versi batch dari clean_text: menerima Series/list, mengembalikan hasil dengan tipe yang sama.
+# Komentar yang sama persis hanya diproses sekali.
+def clean_texts(texts, alay_dict, stopwords, cache=None, metrics=None):
+    keys, words = _clean_unique(texts, alay_dict, stopwords, cache, metrics or NULL_METRICS)
+    joined = {key: ' '.join(key_words) for key, key_words in words.items()}
+    return _like_input(texts, [joined[key] for key in keys])
+
+# Sama dengan clean_texts, ditambah array id token (vocabulary TF-IDF) per komentar.
+# Kata hasil stemming langsung dipetakan ke id; token di luar vocabulary dibuang.
+def clean_texts_with_ids(texts, alay_dict, stopwords, token_index, cache=None, metrics=None):
+    metrics = metrics or NULL_METRICS
+    keys, words = _clean_unique(texts, alay_dict, stopwords, cache, metrics)
+    joined = {key: ' '.join(key_words) for key, key_words in words.items()}
+    with metrics.stage("indeks_token"):
+        ids = {key: token_index.encode(key_words) for key, key_words in words.items()}
+    if metrics.enabled:
+        n_tokens = {key: token_index.count_tokens(key_words) for key, key_words in words.items()}
+        total = sum(n_tokens[key] for key in keys)
+        metrics.count("vectorized_tokens", total)
+        metrics.count("oov_tokens", total - sum(len(ids[key]) for key in keys))
+    return _like_input(texts, [joined[key] for key in keys]), [ids[key] for key in keys]
+
+def _like_input(texts, values):
+    if isinstance(texts, pd.Series):
+        return pd.Series(values, index=texts.index, dtype=object)
+    return values
+
+# Daftar kata hasil preprocessing per komentar unik: (keys, {key: kata})
+def _clean_unique(texts, alay_dict, stopwords, cache, metrics):
+    keys = [str(text) for text in texts]
+    unique_keys = list(dict.fromkeys(keys))
+    
+    # 1. Casefolding & 2. Cleansing
+    with metrics.stage("cleansing"):
+        cleansed = [cleanse_text(key) for key in unique_keys]
     
-    # 1. Casefolding
-    text = text.lower()
+    # 3-7. Diproses per token
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    tokens = {key: text.split() for key, text in zip(unique_keys, cleansed)}
+    words = {key: _normalize_tokens(key_tokens, alay_dict, stopwords, cache, metrics)
+             for key, key_tokens in tokens.items()}
+    
+    if metrics.enabled:
+        # dihitung per baris, sama seperti vectorized_tokens / oov_tokens
+        metrics.count("tokens", sum(len(tokens[key]) for key in keys))
+        metrics.count("comments", len(keys))
+        metrics.count("unique_comments", len(unique_keys))
+        if cache is not None:
+            metrics.count("token_cache_hits", cache.hits - hits)
+            metrics.count("token_cache_misses", cache.misses - misses)
+    return keys, words
+
+def clean_text(text, alay_dict, stopwords, cache=None, metrics=None):
+    # 1. Casefolding & 2. Cleansing
+    text = cleanse_text(text)
     
-    # 2. Cleansing
-    text = re.sub(r'http\S+|www\.\S+', ' ', text)   # Hapus URL
-    text = re.sub(r'<.*?>', ' ', text)              # Hapus HTML tag
-    text = re.sub(r'@\w+', ' ', text)               # Hapus mention
-    text = re.sub(r'&quot;|&gt;|&lt;|&amp;', ' ', text)  # Hapus entitas HTML
-    text = re.sub(r'&#39;', '', text)               # Hapus karakter spesial
-    text = re.sub(r'[^0-9a-zA-Z\s]', ' ', text)      # Hapus tanda baca dan karakter aneh
+    # 3-7. Diproses per token
+    metrics = metrics or NULL_METRICS
+    tokens = text.split()
+    metrics.count("tokens", len(tokens))
+    return ' '.join(_normalize_tokens(tokens, alay_dict, stopwords, cache, metrics))
+
+# Hasil tiap token bisa diambil dari cache; mengembalikan daftar kata
+def _normalize_tokens(tokens, alay_dict, stopwords, cache, metrics):
+    words = []
+    for token in tokens:
+        if cache is None:
+            words.extend(normalize_token(token, alay_dict, stopwords, metrics))
+            continue
+        
+        token_words = cache.get(token)
+        if token_words is None:
+            token_words = normalize_token(token, alay_dict, stopwords, metrics)
+            cache.set(token, token_words)
+        words.extend(token_words)
+    
+    return words
+
+def normalize_token(token, alay_dict, stopwords, metrics=NULL_METRICS):
+    if metrics.enabled:
+        return _normalize_token_timed(token, alay_dict, stopwords, metrics)
+    
+    # 3. Normalization & 4. Removing Repetition Character
+    text = _REPETITION_PATTERN.sub(r'\1', alay_dict.get(token, token))
+    
+    # 5. Tokenizing & 6. Stemming
+    stem = get_stemmer().stem
+    words = [stem(word) for word in text.split()]
+    
+    # 7. Stopword Removal
+    return tuple(word for word in words if word not in stopwords)
+
+# Sama dengan normalize_token, ditambah pencatatan waktu per tahap (hanya saat metrik aktif)
+def _normalize_token_timed(token, alay_dict, stopwords, metrics):
+    start = time.perf_counter()
     
     # 3. Normalization
-    text = ' '.join([alay_dict.get(word, word) for word in text.split()])
+    text = alay_dict.get(token, token)
+    normalized = time.perf_counter()
     
     # 4. Removing Repetition Character
-    text = re.sub(r'(.)\1{2,}', r'\1', text)
+    text = _REPETITION_PATTERN.sub(r'\1', text)
     
     # 5. Tokenizing
     words = text.split()
+    tokenized = time.perf_counter()
     
     # 6. Stemming
-    words = [stemmer.stem(word) for word in words]
+    stem = get_stemmer().stem
+    words = [stem(word) for word in words]
+    stemmed = time.perf_counter()
     
     # 7. Stopword Removal
-    words = [word for word in words if word not in stopwords]
+    words = tuple(word for word in words if word not in stopwords)
     
-    return ' '.join(words)
+    metrics.add_time("normalisasi_alay", normalized - start)
+    metrics.add_time("hapus_karakter_berulang", tokenized - normalized)
+    metrics.add_time("stemming", stemmed - tokenized)
+    metrics.add_time("stopword_removal", time.perf_counter() - stemmed)
+    return words
 
 # Fungsi untuk memuat model TF-IDF, PCA, dan klasifikasi
 def load_models(tfidf_path, pca_path, model_path):
@@ -54,12 +326,17 @@ def load_models(tfidf_path, pca_path, model_path):
     return tfidf, pca, model
 
 # Fungsi preprocessing lanjutan: TF-IDF + PCA
-def preprocess_features(text_series, tfidf, pca):
-    tfidf_features = tfidf.transform(text_series)
-    reduced_features = pca.transform(tfidf_features.toarray())
+def preprocess_features(text_series, tfidf, pca, metrics=None):
+    metrics = metrics or NULL_METRICS
+    with metrics.stage("tfidf"):
+        tfidf_features = tfidf.transform(text_series)
+    with metrics.stage("pca"):
+        reduced_features = pca.transform(tfidf_features.toarray())
     return reduced_features
 
 # Fungsi klasifikasi
-def classify_comments(features, model):
-    predictions = model.predict(features)
+def classify_comments(features, model, metrics=None):
+    metrics = metrics or NULL_METRICS
+    with metrics.stage("prediksi"):
+        predictions = model.predict(features)
     return predictions
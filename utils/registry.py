@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.loader import load_alay_dictionary, load_stopwords
+
+# Registry resource seumur proses server: kamus, stopwords, stemmer dan model
+# dimuat sekali, lalu dimuat ulang hanya jika file sumbernya berubah.
+# Modul ini tetap ada di sys.modules selama server hidup, sehingga rerun
+# Streamlit tidak memuat ulang apa pun.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+KAMUS_ALAY_PATH = os.path.join(BASE_DIR, "data", "kamusalay2.csv")
+ADDITIONAL_ALAY_PATH = os.path.join(BASE_DIR, "data", "additional_dict-alay.csv")
+STOPWORDS_PATH = os.path.join(BASE_DIR, "data", "stopwordbahasa.csv")
+
+TFIDF_PATH = os.path.join(BASE_DIR, "model", "tfidf_vectorizer.joblib")
+PCA_PATH = os.path.join(BASE_DIR, "model", "pca_transformer.joblib")
+MODEL_PATH = os.path.join(BASE_DIR, "model", "sentiment_model.joblib")
+
+# Cache ikut folder proyek, bukan direktori kerja, supaya CLI/layanan yang dijalankan
+# dari folder lain memakai cache yang sama dengan aplikasi
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+TOKEN_CACHE_PATH = os.path.join(CACHE_DIR, "token_cache.joblib")
+RESULT_STORE_PATH = os.path.join(CACHE_DIR, "results.sqlite3")
+
+ADDITIONAL_STOPWORDS = ["lah", "nya", "kalau", "the", "of", "and", "i", "aku", "gue", "kak",
+    "kamu", "a", "to", "ku", "rela", "kakak", "eh", "for", "did", "is", "ah", "cui", "nge"]  # extend manual
+
+EXCLUDED_STOPWORDS = ["tidak", "kok", "serta", "peserta", "harus", "lagi", "dong", "doang",
+    "tolong", "kenapa", "apa", "kapan", "bagaimana", "dimana", "berapa", "tahun", "ada", "mana",
+    "siapa", "terus", "penerus", "gitu", "begitu", "gini", "begini","bisa", "dapat", "ingin",
+    "mungkin", "jadi", "atur", "pengaturan", "sudah", "udah","diri", "sendiri", "memang", "agak",
+    "sedikit", "kurang", "boleh", "juga", "kembali", "balik", "soal", "ya","sudah", "ingin",
+    "tanya", "saja", "pada", "ayo", "keluar", "lalu", "tiap","hari", "bulan", "kalau", "kalian",
+    "masih", "kira", "masalah", "sekarang", "belum", "pasti", "sebelum", "sesudah", "terlalu",
+    "lebih", "tangis", "pernah", "satu", "dua", "tiga", "empat", "lima", "enam", "tujuh",
+    "delapan", "sembilan", "sepuluh", "sebelas", "season", "lain"]   # exclude
+
+_resources = {}
+_timings = []
+_lock = threading.RLock()
+
+def _file_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+def record_timing(name, seconds, kind="load"):
+    with _lock:
+        _timings.append({"name": name, "kind": kind, "seconds": seconds, "at": time.time()})
+
+# Ukur waktu sebuah blok (mis. import pustaka berat) untuk laporan startup.
+# Hanya pengukuran pertama yang dicatat; rerun berikutnya tidak mengukur apa pun.
+@contextmanager
+def timed(name, kind="import"):
+    with _lock:
+        first = not any(item["name"] == name for item in _timings)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if first:
+            record_timing(name, time.perf_counter() - start, kind)
+
+# Ambil resource dari registry; loader dipanggil lagi hanya kalau salah satu file di paths berubah
+def get_resource(name, loader, paths=()):
+    signature = _file_signature(paths)
+    with _lock:
+        entry = _resources.get(name)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        start = time.perf_counter()
+        value = loader()
+        record_timing(name, time.perf_counter() - start, "reload" if entry is not None else "load")
+        _resources[name] = (signature, value)
+        return value
+
+# Daftar waktu muat per resource/import, diurutkan dari yang paling lama
+def startup_report():
+    with _lock:
+        timings = list(_timings)
+    return sorted(timings, key=lambda item: item["seconds"], reverse=True)
+
+# --- Resource aplikasi ---
+def get_alay_dict():
+    return get_resource(
+        "alay_dict",
+        lambda: load_alay_dictionary(kamusalay_filepath=KAMUS_ALAY_PATH, additional_filepath=ADDITIONAL_ALAY_PATH),
+        [KAMUS_ALAY_PATH, ADDITIONAL_ALAY_PATH]
+    )
+
+def get_stopwords():
+    return get_resource(
+        "stopwords",
+        lambda: load_stopwords(stopwords_filepath=STOPWORDS_PATH, additional_stopwords=ADDITIONAL_STOPWORDS,
+                               excluded_stopwords=EXCLUDED_STOPWORDS),
+        [STOPWORDS_PATH]
+    )
+
+def get_stemmer():
+    from utils.processing import get_stemmer as create_stemmer
+    return get_resource("stemmer", create_stemmer)
+
+def get_inference_engine():
+    def load():
+        from utils.inference import load_inference_engine
+        return load_inference_engine(TFIDF_PATH, PCA_PATH, MODEL_PATH)
+
+    return get_resource("inference_engine", load, [TFIDF_PATH, PCA_PATH, MODEL_PATH])
+
+# Cache token hanya valid untuk kamus yang sama, jadi ikut dibuat ulang saat kamus berubah
+def get_token_cache():
+    def load():
+        from utils.token_cache import TokenCache, resource_fingerprint
+        token_cache = TokenCache(fingerprint=resource_fingerprint(get_alay_dict(), get_stopwords()))
+        token_cache.warm(TOKEN_CACHE_PATH)
+        return token_cache
+
+    return get_resource("token_cache", load, [KAMUS_ALAY_PATH, ADDITIONAL_ALAY_PATH, STOPWORDS_PATH])
+
+# Store hasil per komentar; dibuka ulang dengan fingerprint baru saat kamus atau
+# artefak model berubah, dan hasil milik fingerprint lama langsung dihapus
+def get_result_store():
+    paths = [KAMUS_ALAY_PATH, ADDITIONAL_ALAY_PATH, STOPWORDS_PATH, TFIDF_PATH, PCA_PATH, MODEL_PATH]
+
+    def load():
+        from utils.result_store import ResultStore, pipeline_fingerprint
+        fingerprint = pipeline_fingerprint(get_alay_dict(), get_stopwords(), [TFIDF_PATH, PCA_PATH, MODEL_PATH])
+        result_store = ResultStore(RESULT_STORE_PATH, fingerprint)
+        result_store.prune()
+        return result_store
+
+    return get_resource("result_store", load, paths)
+
+# Pool worker job klasifikasi latar belakang, satu per proses server
+def get_job_manager():
+    def load():
+        from utils.jobs import JobManager
+        return JobManager()
+
+    return get_resource("job_manager", load)
+
+# Process pool preprocessing paralel, dipakai ulang oleh setiap chunk dan setiap job
+def get_cleaning_pool():
+    def load():
+        from utils.processing import CleaningPool
+        return CleaningPool()
+
+    return get_resource("cleaning_pool", load)
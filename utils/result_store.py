@@ -0,0 +1,103 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+from utils.snapshot import source_fingerprint
+from utils.token_cache import resource_fingerprint
+
+# Penyimpanan hasil per komentar (SQLite): hash komentar mentah -> cleaned_comment
+# + predicted_label. Setiap baris diberi fingerprint pipeline (kamus alay,
+# stopwords, artefak model), sehingga hasil dari artefak lama tidak pernah terbaca.
+
+# Batas jumlah parameter per query (SQLite lama membatasi 999 variabel)
+_LOOKUP_BATCH = 500
+
+# Fingerprint gabungan kamus + isi file artefak model (TF-IDF, PCA, model)
+def pipeline_fingerprint(alay_dict, stopwords, artifact_paths):
+    digest = hashlib.sha256(resource_fingerprint(alay_dict, stopwords).encode("ascii"))
+    for path in artifact_paths:
+        digest.update(b"\0" + source_fingerprint(path).encode("ascii"))
+    return digest.hexdigest()
+
+def comment_hash(comment):
+    return hashlib.sha256(str(comment).encode("utf-8", "surrogatepass")).digest()
+
+class ResultStore:
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint[:16]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # satu koneksi dipakai bersama oleh thread sesi Streamlit, dijaga dengan lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " fingerprint TEXT NOT NULL,"
+            " comment_hash BLOB NOT NULL,"
+            " cleaned_comment TEXT NOT NULL,"
+            " predicted_label NOT NULL,"
+            " PRIMARY KEY (fingerprint, comment_hash)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results WHERE fingerprint = ?",
+                                      (self.fingerprint,)).fetchone()[0]
+
+    # Ambil hasil untuk banyak hash sekaligus: {hash: (cleaned_comment, predicted_label)}
+    def lookup(self, hashes):
+        unique_hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with self._lock:
+            for i in range(0, len(unique_hashes), _LOOKUP_BATCH):
+                batch = unique_hashes[i:i + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    "SELECT comment_hash, cleaned_comment, predicted_label FROM results "
+                    f"WHERE fingerprint = ? AND comment_hash IN ({','.join('?' * len(batch))})",
+                    [self.fingerprint, *batch]
+                )
+                for key, cleaned, label in rows:
+                    found[key] = (cleaned, label)
+            self.hits += len(found)
+            self.misses += len(unique_hashes) - len(found)
+        return found
+
+    # Simpan banyak hasil dalam satu transaksi; items berisi (hash, cleaned_comment, predicted_label)
+    def store(self, items):
+        rows = [(self.fingerprint, key, cleaned, _to_python(label)) for key, cleaned, label in items]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    # Hapus hasil milik fingerprint lain (kamus atau model yang sudah berubah)
+    def prune(self):
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM results WHERE fingerprint != ?", (self.fingerprint,)).rowcount
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Label dari numpy (np.int64, np.str_) disimpan sebagai tipe Python biasa
+def _to_python(value):
+    return value.item() if hasattr(value, "item") else value
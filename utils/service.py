@@ -0,0 +1,292 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from utils import registry
+from utils.metrics import RunMetrics
+from utils.processing import LABEL_MAP, clean_texts, clean_texts_with_ids
+
+# Entry point headless untuk pipeline klasifikasi:
+#   python -m utils.service classify komentar.xlsx -o hasil.xlsx
+#   python -m utils.service serve --port 8502
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 20
+REQUEST_TIMEOUT = 30
+# Batas ukuran body POST /classify
+MAX_BODY_BYTES = 1 << 20
+
+# Resource pipeline dimuat sekali saat startup lewat registry
+def load_pipeline():
+    return {
+        "alay_dict": registry.get_alay_dict(),
+        "stopwords": registry.get_stopwords(),
+        "stemmer": registry.get_stemmer(),
+        "engine": registry.get_inference_engine(),
+        "cache": registry.get_token_cache(),
+        "store": registry.get_result_store(),
+    }
+
+def classify_batch(comments, pipeline, metrics=None):
+    store = pipeline.get("store")
+    if store is not None:
+        from utils.streaming import classify_chunk
+        result = classify_chunk(pd.DataFrame({"comment": comments}), pipeline["alay_dict"], pipeline["stopwords"],
+                                pipeline["engine"], cache=pipeline["cache"], metrics=metrics, store=store)
+        cleaned, predictions = result["cleaned_comment"], result["predicted_label"]
+    elif getattr(pipeline["engine"], "token_index", None) is not None:
+        cleaned, token_ids = clean_texts_with_ids(comments, pipeline["alay_dict"], pipeline["stopwords"],
+                                                  pipeline["engine"].token_index, pipeline["cache"], metrics=metrics)
+        predictions = pipeline["engine"].predict_token_ids(token_ids, metrics=metrics)
+    else:
+        cleaned = clean_texts(comments, pipeline["alay_dict"], pipeline["stopwords"], pipeline["cache"], metrics=metrics)
+        predictions = pipeline["engine"].predict(cleaned, metrics=metrics)
+    # jalur result store (classify_chunk) sudah menghitung rows sendiri
+    if store is None and metrics is not None:
+        metrics.count("rows", len(comments))
+    return [
+        {"cleaned_comment": text, "predicted_label": int(label), "label_text": LABEL_MAP.get(int(label))}
+        for text, label in zip(cleaned, predictions)
+    ]
+
+# --- Micro-batching ---
+# Request tunggal dari banyak thread dikumpulkan menjadi satu batch, diproses
+# paling lambat max_wait_ms setelah request pertama masuk atau saat batch penuh.
+class MicroBatcher:
+    def __init__(self, pipeline, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        # metrik kumulatif per tahap sejak layanan berjalan (GET /metrics)
+        self.metrics = RunMetrics()
+        self._metrics_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, comment):
+        future = Future()
+        self._queue.put((str(comment), future))
+        return future
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            comments = [comment for comment, _ in batch]
+            batch_metrics = RunMetrics()
+            try:
+                results = classify_batch(comments, self.pipeline, metrics=batch_metrics)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            with self._metrics_lock:
+                self.metrics.merge(batch_metrics)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queue_size": self._queue.qsize(),
+        }
+
+    def prometheus_metrics(self):
+        with self._metrics_lock:
+            return self.metrics.to_prometheus()
+
+# --- HTTP endpoint ---
+#   POST /classify  {"comment": "..."} atau {"comments": ["...", ...]}
+#   GET  /health
+#   GET  /metrics   (format teks Prometheus)
+class ClassificationHandler(BaseHTTPRequestHandler):
+    batcher = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = self.batcher.prometheus_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path != "/health":
+            self._send_json(404, {"error": "Endpoint tidak ditemukan."})
+            return
+        self._send_json(200, {"status": "ok", **self.batcher.stats()})
+
+    def do_POST(self):
+        if self.path != "/classify":
+            self._send_json(404, {"error": "Endpoint tidak ditemukan."})
+            return
+
+        # Content-Length wajib dan divalidasi: nilai negatif membuat rfile.read(-1)
+        # menunggu sampai klien memutus koneksi
+        try:
+            length = int(self.headers.get("Content-Length"))
+        except (TypeError, ValueError):
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "Header Content-Length tidak ada atau tidak valid."})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": f"Body melebihi batas {MAX_BODY_BYTES} byte."})
+            return
+
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {"error": "Body harus berupa JSON yang valid."})
+            return
+
+        if not isinstance(payload, dict):
+            self._send_json(400, {"error": "Body harus berupa objek JSON."})
+            return
+
+        if isinstance(payload.get("comments"), list):
+            comments, single = payload["comments"], False
+        elif "comment" in payload:
+            comments, single = [payload["comment"]], True
+        else:
+            self._send_json(400, {"error": "Body harus berisi 'comment' atau 'comments'."})
+            return
+
+        try:
+            futures = [self.batcher.submit(comment) for comment in comments]
+            results = [future.result(timeout=REQUEST_TIMEOUT) for future in futures]
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, results[0] if single else {"results": results})
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(host, port, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    pipeline = load_pipeline()
+    batcher = MicroBatcher(pipeline, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    handler = type("Handler", (ClassificationHandler,), {"batcher": batcher})
+
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Layanan klasifikasi berjalan di http://{host}:{port} (batch maks {max_batch_size}, "
+          f"tunggu maks {max_wait_ms} ms)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+        pipeline["cache"].save(registry.TOKEN_CACHE_PATH)
+
+# --- CLI file massal ---
+def classify_file(input_path, output_path, chunk_size, n_jobs=1, metrics_path=None):
+    from utils.streaming import (STREAM_WRITERS, classify_stream, detect_file_type, iter_comment_chunks,
+                                 read_chunk_rows)
+
+    input_type = detect_file_type(input_path)
+    output_type = detect_file_type(output_path)
+    if output_type not in STREAM_WRITERS:
+        raise ValueError(f"Format output '{output_type}' tidak didukung. Gunakan xlsx, csv, atau parquet.")
+
+    pipeline = load_pipeline()
+    metrics = RunMetrics() if metrics_path else None
+    start = time.perf_counter()
+
+    def on_chunk(result, total_rows):
+        print(f"{total_rows} baris selesai", file=sys.stderr)
+
+    total_rows = classify_stream(
+        iter_comment_chunks(input_path, input_type, chunk_size=read_chunk_rows(chunk_size, n_jobs)),
+        STREAM_WRITERS[output_type](output_path),
+        pipeline["alay_dict"], pipeline["stopwords"], pipeline["engine"],
+        cache=pipeline["cache"], on_chunk=on_chunk, n_jobs=n_jobs, metrics=metrics, store=pipeline["store"],
+        chunk_size=chunk_size
+    )
+    pipeline["cache"].save(registry.TOKEN_CACHE_PATH)
+
+    elapsed = time.perf_counter() - start
+    print(f"Selesai: {total_rows} baris dalam {elapsed:.1f} detik -> {output_path}", file=sys.stderr)
+    if metrics:
+        # .prom -> format teks Prometheus, selain itu JSON
+        metrics.finish()
+        with open(metrics_path, "w", encoding="utf-8") as f:
+            f.write(metrics.to_prometheus() if metrics_path.endswith(".prom") else metrics.to_json(indent=2))
+    return total_rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Klasifikasi sentimen komentar tanpa antarmuka Streamlit.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    classify_parser = subparsers.add_parser("classify", help="Klasifikasi file komentar (xlsx, csv, parquet).")
+    classify_parser.add_argument("input", help="File input dengan kolom 'comment'.")
+    classify_parser.add_argument("-o", "--output", required=True, help="File output (xlsx, csv, atau parquet).")
+    classify_parser.add_argument("--chunk-size", type=int, default=5000,
+                                 help="Baris per chunk; dengan --n-jobs > 1 ukuran potongan per worker.")
+    classify_parser.add_argument("--n-jobs", type=int, default=1, help="Jumlah worker preprocessing (0 = semua core).")
+    classify_parser.add_argument("--metrics", help="Simpan waktu per tahap ke file (.json atau .prom).")
+
+    serve_parser = subparsers.add_parser("serve", help="Jalankan endpoint HTTP lokal dengan micro-batching.")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8502)
+    serve_parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    serve_parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+
+    args = parser.parse_args(argv)
+    if args.command == "classify":
+        classify_file(args.input, args.output, args.chunk_size, args.n_jobs, args.metrics)
+    else:
+        serve(args.host, args.port, args.max_batch_size, args.max_wait_ms)
+
+if __name__ == "__main__":
+    main()
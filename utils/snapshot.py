@@ -0,0 +1,161 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import joblib
+import pandas as pd
+
+from utils.processing import LABEL_MAP
+from utils.registry import CACHE_DIR
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+
+TOP_LIKED_N = 5
+
+# Memo dalam proses: (path sumber, jenis) -> (signature file, nilai).
+# Rerun Streamlit cukup melakukan os.stat, tanpa membaca file apa pun.
+_memory_cache = {}
+_lock = threading.Lock()
+
+# Tulis file secara atomik: write(tmp_path) menulis ke file temporer unik di folder
+# tujuan (aman untuk beberapa thread/proses sekaligus), lalu dipindah dengan os.replace.
+# Pembaca tidak pernah melihat file setengah jadi; temporer milik sendiri dihapus jika gagal.
+def atomic_write(path, write, suffix=".tmp"):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Hash isi file sumber. Hash hanya dihitung ulang kalau mtime/ukuran berubah;
+# file yang di-touch tanpa perubahan isi tidak memicu rebuild snapshot.
+def source_fingerprint(source_path, snapshot_dir=SNAPSHOT_DIR):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    meta_path = os.path.join(snapshot_dir, f"{stem}.meta.json")
+    signature = _file_signature(source_path)
+
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    if meta.get("signature") == signature and meta.get("sha256"):
+        return meta["sha256"]
+
+    sha256 = _file_hash(source_path)
+    meta = {"source": source_path, "signature": signature, "sha256": sha256}
+    atomic_write(meta_path, lambda path: _write_json(path, meta))
+    return sha256
+
+def _write_json(path, value):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+
+def _artifact_path(source_path, kind, extension, fingerprint, snapshot_dir):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(snapshot_dir, f"{stem}.{kind}-{fingerprint[:16]}.{extension}")
+
+def _remove_stale(source_path, kind, extension, keep_path, snapshot_dir):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    for path in glob.glob(os.path.join(snapshot_dir, f"{stem}.{kind}-*.{extension}")):
+        if os.path.abspath(path) != os.path.abspath(keep_path):
+            # sesi lain bisa saja sudah menghapusnya
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def _memoized(source_path, kind, build):
+    key = (os.path.abspath(source_path), kind)
+    signature = _file_signature(source_path)
+    with _lock:
+        cached = _memory_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+    value = build()
+    with _lock:
+        _memory_cache[key] = (signature, value)
+    return value
+
+def to_columnar(df):
+    # Kolom object dengan tipe campuran (mis. angka + teks) tidak bisa ditulis ke parquet
+    for column in df.columns[df.dtypes == object]:
+        values = df[column]
+        if values.dropna().map(type).nunique() > 1:
+            df[column] = values.where(values.isna(), values.astype(str))
+    return df
+
+# Snapshot kolumnar (parquet) dari workbook sumber, dibangun ulang hanya jika isi file berubah.
+# Snapshot & artefak ditulis atomik: file dengan kunci yang cocok selalu utuh
+def load_table(source_path, snapshot_dir=SNAPSHOT_DIR):
+    def build():
+        fingerprint = source_fingerprint(source_path, snapshot_dir)
+        snapshot_path = _artifact_path(source_path, "table", "parquet", fingerprint, snapshot_dir)
+        if os.path.exists(snapshot_path):
+            return pd.read_parquet(snapshot_path)
+
+        df = to_columnar(pd.read_excel(source_path))
+        atomic_write(snapshot_path, lambda path: df.to_parquet(path, index=False), suffix=".parquet.tmp")
+        _remove_stale(source_path, "table", "parquet", snapshot_path, snapshot_dir)
+        return df
+
+    return _memoized(source_path, "table", build)
+
+# Agregat dashboard Home yang sudah dihitung sebelumnya
+def build_dashboard_aggregates(df, top_n=TOP_LIKED_N):
+    df = df.copy()
+    df["publishedAt"] = pd.to_datetime(df["publishedAt"])
+    df["label_text"] = df["label"].map(LABEL_MAP)
+
+    trend_df = df.groupby([df["publishedAt"].dt.date, "label_text"]).size().reset_index(name="count")
+    top_liked = df.sort_values(by="likeCount", ascending=False).head(top_n)[["username", "comment", "likeCount"]]
+
+    return {
+        "total_komentar": int(df["comment"].count()),
+        "total_user": int(df["username"].nunique()),
+        "label_counts": df["label_text"].value_counts().reindex(["Positif", "Netral", "Negatif"]),
+        "trend": trend_df,
+        "top_liked": top_liked.reset_index(drop=True),
+    }
+
+# Artefak turunan (joblib) dari file sumber: dimuat dari memo/disk jika isi
+# sumber belum berubah, selain itu dibangun ulang dengan build_fn(source_path)
+def cached_artifact(source_path, kind, build_fn, snapshot_dir=SNAPSHOT_DIR):
+    def build():
+        fingerprint = source_fingerprint(source_path, snapshot_dir)
+        artifact_path = _artifact_path(source_path, kind, "joblib", fingerprint, snapshot_dir)
+        if os.path.exists(artifact_path):
+            return joblib.load(artifact_path)
+
+        artifact = build_fn(source_path)
+        atomic_write(artifact_path, lambda path: joblib.dump(artifact, path))
+        _remove_stale(source_path, kind, "joblib", artifact_path, snapshot_dir)
+        return artifact
+
+    return _memoized(source_path, kind, build)
+
+def load_dashboard_aggregates(source_path, snapshot_dir=SNAPSHOT_DIR):
+    return cached_artifact(
+        source_path, "dashboard",
+        lambda path: build_dashboard_aggregates(load_table(path, snapshot_dir)),
+        snapshot_dir
+    )
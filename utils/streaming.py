@@ -0,0 +1,340 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from utils.metrics import NULL_METRICS
+from utils.processing import LABEL_MAP, MIN_PARALLEL_ROWS, preprocess_comments
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Tentukan tipe file dari nama file (xlsx, csv, parquet)
+def detect_file_type(filename):
+    extension = os.path.splitext(str(filename))[1].lower().lstrip(".")
+    if extension in ("xlsx", "xlsm"):
+        return "xlsx"
+    if extension in ("csv", "parquet"):
+        return extension
+    raise ValueError(f"Format file '{extension}' tidak didukung. Gunakan xlsx, csv, atau parquet.")
+
+# --- Pembaca per chunk ---
+def iter_excel_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Mode read-only openpyxl membaca baris satu per satu tanpa memuat seluruh sheet
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(col) if col is not None else f"Unnamed: {i}" for i, col in enumerate(header)]
+        width = len(columns)
+
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+def iter_csv_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    yield from pd.read_csv(source, chunksize=chunk_size)
+
+def iter_parquet_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Membaca file parquet membutuhkan pustaka 'pyarrow'.") from e
+
+    parquet_file = pq.ParquetFile(source)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+def iter_comment_chunks(source, file_type, chunk_size=DEFAULT_CHUNK_SIZE):
+    readers = {"xlsx": iter_excel_chunks, "csv": iter_csv_chunks, "parquet": iter_parquet_chunks}
+    if file_type not in readers:
+        raise ValueError(f"Format file '{file_type}' tidak didukung. Gunakan xlsx, csv, atau parquet.")
+    return readers[file_type](source, chunk_size)
+
+# Jumlah baris per chunk baca. chunk_size adalah ukuran potongan per worker; pada mode
+# paralel satu chunk baca memuat potongan untuk semua worker dan minimal MIN_PARALLEL_ROWS
+# baris, karena di bawah itu preprocess_comments berjalan serial
+def read_chunk_rows(chunk_size, n_jobs=1):
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    return max(chunk_size * n_jobs, MIN_PARALLEL_ROWS) if n_jobs > 1 else chunk_size
+
+# Perkiraan jumlah baris data untuk progres & ETA. xlsx: dimensi sheet (batas atas,
+# baris kosong ikut terhitung), csv: jumlah record tanpa header dan baris kosong
+# (komentar bisa berisi baris baru di dalam tanda kutip), parquet: metadata.
+def estimate_rows(path, file_type):
+    if file_type == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    if file_type == "xlsx":
+        workbook = load_workbook(path, read_only=True)
+        try:
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        return max(max_row - 1, 0) if max_row else None
+    if file_type == "csv":
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+            records = sum(1 for row in csv.reader(f) if row)
+        return max(records - 1, 0)
+    raise ValueError(f"Format file '{file_type}' tidak didukung. Gunakan xlsx, csv, atau parquet.")
+
+# --- Penulis hasil per chunk ---
+def _to_cell_values(df):
+    # openpyxl tidak mengenal NaN/NaT, ganti dengan sel kosong
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+class ExcelStreamWriter:
+    # Workbook write-only: baris langsung di-flush ke file, memori konstan
+    def __init__(self, target):
+        self.target = target
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.columns = None
+
+    def write(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self.sheet.append(self.columns)
+        for row in _to_cell_values(df[self.columns]):
+            self.sheet.append(row)
+
+    def close(self):
+        if self.columns is None:
+            self.sheet.append([])
+        self.workbook.save(self.target)
+
+class CsvStreamWriter:
+    # target bisa berupa path atau buffer biner (mis. BytesIO / file temporer)
+    def __init__(self, target):
+        self.target = target
+        self._owns_file = isinstance(target, (str, os.PathLike))
+        if self._owns_file:
+            self.file = open(target, "w", encoding="utf-8", newline="")
+        else:
+            self.file = io.TextIOWrapper(target, encoding="utf-8", newline="", write_through=True)
+        self.columns = None
+
+    def write(self, df):
+        header = self.columns is None
+        if header:
+            self.columns = list(df.columns)
+        df[self.columns].to_csv(self.file, index=False, header=header, quoting=csv.QUOTE_MINIMAL)
+
+    def close(self):
+        self.file.flush()
+        if self._owns_file:
+            self.file.close()
+        else:
+            # Lepas wrapper tanpa menutup buffer milik pemanggil
+            self.file.detach()
+
+# Skema gabungan per kolom dari beberapa skema parquet: int + float -> float,
+# kolom yang selalu kosong ikut tipe lain, tipe yang tidak bisa digabung -> string
+def unify_schemas(schemas, columns):
+    import pyarrow as pa
+
+    fields = []
+    for name in columns:
+        column_schemas = [pa.schema([schema.field(name)]) for schema in schemas if name in schema.names]
+        try:
+            field = pa.unify_schemas(column_schemas, promote_options="permissive").field(name)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            field = pa.field(name, pa.string())
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+class ParquetStreamWriter:
+    # Tiap chunk menjadi satu row group. Jika schema diberikan, chunk langsung dikonversi
+    # ke skema itu. Jika tidak, tiap chunk ditulis dulu sebagai potongan sementara dengan
+    # skemanya sendiri lalu digabung saat close (lihat unify_schemas), sehingga tipe kolom
+    # yang berubah di chunk berikutnya (mis. likeCount int -> float) tidak menggagalkan
+    # penulisan.
+    def __init__(self, target, schema=None):
+        self.target = target
+        self.schema = schema
+        self.writer = None
+        self.columns = None
+        self._parts_dir = None
+        self._parts = []
+
+    def _schema_for(self, df):
+        import pyarrow as pa
+
+        fields = []
+        for name in df.columns:
+            values = df[name]
+            type_ = pa.string() if values.dtype == object else pa.Array.from_pandas(values).type
+            fields.append(pa.field(name, pa.string() if pa.types.is_null(type_) else type_))
+        return pa.schema(fields)
+
+    def _to_table(self, df, schema):
+        import pyarrow as pa
+
+        arrays = []
+        for field in schema:
+            values = df[field.name]
+            if pa.types.is_string(field.type):
+                values = values.astype(object).where(values.notna(), None)
+                values = values.map(lambda value: value if value is None else str(value))
+            try:
+                arrays.append(pa.array(values, type=field.type, from_pandas=True))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"Kolom '{field.name}' tidak bisa ditulis sebagai {field.type}: {e}") from e
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    def write(self, df):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Menulis file parquet membutuhkan pustaka 'pyarrow'.") from e
+
+        if self.schema is not None:
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.target, self.schema)
+            self.writer.write_table(self._to_table(df, self.schema))
+            return
+
+        if self.columns is None:
+            self.columns = list(df.columns)
+            base_dir = os.path.dirname(os.path.abspath(self.target)) if isinstance(self.target, (str, os.PathLike)) else None
+            self._parts_dir = tempfile.mkdtemp(prefix=".parquet_parts_", dir=base_dir)
+        df = df[self.columns]
+        schema = self._schema_for(df)
+        path = os.path.join(self._parts_dir, f"part-{len(self._parts):05d}.parquet")
+        pq.write_table(self._to_table(df, schema), path)
+        self._parts.append((path, schema))
+
+    def close(self):
+        import pyarrow.parquet as pq
+
+        try:
+            if self.schema is None and self._parts:
+                self.schema = unify_schemas([schema for _, schema in self._parts], self.columns)
+                self.writer = pq.ParquetWriter(self.target, self.schema)
+                for path, _ in self._parts:
+                    self.writer.write_table(pq.read_table(path).select(self.columns).cast(self.schema))
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.target, self.schema or self._schema_for(pd.DataFrame()))
+            self.writer.close()
+        finally:
+            if self._parts_dir is not None:
+                shutil.rmtree(self._parts_dir, ignore_errors=True)
+
+STREAM_WRITERS = {"xlsx": ExcelStreamWriter, "csv": CsvStreamWriter, "parquet": ParquetStreamWriter}
+
+OUTPUT_MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# --- Pipeline per chunk ---
+# engine: FusedLinearClassifier dari utils.inference (TF-IDF -> PCA -> model tanpa densifikasi)
+# store: ResultStore dari utils.result_store; komentar yang sudah pernah diproses tidak dihitung ulang
+def classify_chunk(df, alay_dict, stopwords, engine, cache=None, n_jobs=1, metrics=None, store=None,
+                   chunk_size=2000):
+    if store is not None:
+        return _classify_chunk_with_store(df, alay_dict, stopwords, engine, cache, n_jobs, metrics, store, chunk_size)
+
+    # 1. Preprocessing awal (cleaned_comment + id token TF-IDF)
+    df = preprocess_comments(df, alay_dict, stopwords, cache=cache, n_jobs=n_jobs, chunk_size=chunk_size,
+                             metrics=metrics, token_index=getattr(engine, "token_index", None))
+
+    # 2. Preprocessing lanjutan (TF-IDF + PCA) dan klasifikasi
+    df["predicted_label"] = _predict_cleaned(df, engine, metrics)
+
+    # 3. Mapping label angka ke teks
+    df["label_text"] = df["predicted_label"].map(LABEL_MAP)
+    return df
+
+# Kolom token_ids (jika ada) dipakai langsung untuk TF-IDF lalu dibuang dari hasil
+def _predict_cleaned(df, engine, metrics):
+    if "token_ids" in df.columns:
+        return engine.predict_token_ids(df.pop("token_ids").tolist(), metrics=metrics)
+    return engine.predict(df["cleaned_comment"], metrics=metrics)
+
+# Ambil semua hasil yang sudah tersimpan sekaligus, hanya baris yang belum ada
+# yang melewati pipeline, lalu hasil barunya ditulis balik dalam satu transaksi
+def _classify_chunk_with_store(df, alay_dict, stopwords, engine, cache, n_jobs, metrics, store, chunk_size):
+    from utils.result_store import comment_hash
+
+    metrics = metrics or NULL_METRICS
+    df = df.rename(columns=lambda x: x.lower())
+    if "comment" not in df.columns:
+        raise ValueError("Kolom 'comment' tidak ditemukan pada file yang diunggah.")
+
+    with metrics.stage("result_store"):
+        hashes = [comment_hash(comment) for comment in df["comment"]]
+        found = store.lookup(hashes)
+    missing = np.array([key not in found for key in hashes], dtype=bool)
+
+    cleaned = np.empty(len(df), dtype=object)
+    labels = np.empty(len(df), dtype=engine.classes_.dtype)
+    for i, key in enumerate(hashes):
+        if key in found:
+            cleaned[i], labels[i] = found[key]
+
+    if missing.any():
+        computed = preprocess_comments(df.loc[missing, ["comment"]], alay_dict, stopwords,
+                                       cache=cache, n_jobs=n_jobs, chunk_size=chunk_size, metrics=metrics,
+                                       token_index=getattr(engine, "token_index", None))
+        cleaned[missing] = computed["cleaned_comment"].to_numpy()
+        labels[missing] = _predict_cleaned(computed, engine, metrics)
+        with metrics.stage("result_store"):
+            missing_hashes = [key for key, is_missing in zip(hashes, missing) if is_missing]
+            store.store(zip(missing_hashes, cleaned[missing], labels[missing]))
+
+    if metrics.enabled:
+        metrics.count("result_store_hits", int(len(df) - missing.sum()))
+        metrics.count("result_store_misses", int(missing.sum()))
+        metrics.count("rows", int(len(df) - missing.sum()))
+
+    df["cleaned_comment"] = pd.Series(cleaned, index=df.index, dtype=object)
+    df["predicted_label"] = labels
+    df["label_text"] = df["predicted_label"].map(LABEL_MAP)
+    return df
+
+# Jalankan klasifikasi chunk demi chunk dan tulis hasilnya langsung ke writer.
+# Puncak memori bergantung pada ukuran chunk, bukan ukuran file. chunk_size adalah
+# ukuran potongan per worker saat satu chunk diproses paralel (n_jobs > 1).
+def classify_stream(chunks, writer, alay_dict, stopwords, engine, cache=None, on_chunk=None, n_jobs=1,
+                    metrics=None, store=None, chunk_size=2000):
+    metrics = metrics or NULL_METRICS
+    total_rows = 0
+    try:
+        for chunk in chunks:
+            result = classify_chunk(chunk, alay_dict, stopwords, engine, cache=cache, n_jobs=n_jobs,
+                                    metrics=metrics, store=store, chunk_size=chunk_size)
+            with metrics.stage("serialisasi_output"):
+                writer.write(result)
+            total_rows += len(result)
+            if on_chunk is not None:
+                on_chunk(result, total_rows)
+    finally:
+        with metrics.stage("serialisasi_output"):
+            writer.close()
+    # writer yang menulis ke folder (mis. ResultPartsWriter) melaporkan ukurannya sendiri
+    if getattr(writer, "bytes_written", None) is not None:
+        metrics.count("bytes_written", writer.bytes_written)
+    elif isinstance(writer.target, (str, os.PathLike)) and os.path.isfile(writer.target):
+        metrics.count("bytes_written", os.path.getsize(writer.target))
+    return total_rows
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import joblib
+
+# Fingerprint kamus alay + stopwords. Isi cache hanya valid untuk kombinasi
+# kamus yang sama, jadi fingerprint ini disimpan bersama cache di disk.
+def resource_fingerprint(alay_dict, stopwords):
+    digest = hashlib.sha256()
+    for alay, formal in sorted(alay_dict.items(), key=lambda item: str(item[0])):
+        digest.update(f"{alay}\t{formal}\n".encode("utf-8", "surrogatepass"))
+    digest.update(b"\0")
+    for word in sorted(stopwords, key=str):
+        digest.update(f"{word}\n".encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+# Cache token mentah -> kata hasil akhir (normalisasi alay, hapus karakter
+# berulang, stemming, stopword removal). Ukurannya dibatasi dengan eviksi LRU.
+class TokenCache:
+    def __init__(self, maxsize=200_000, fingerprint=None):
+        self.maxsize = maxsize
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._new_entries = None
+
+    # Lock tidak bisa di-pickle; dibuat ulang saat cache dikirim ke worker proses
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token):
+        with self._lock:
+            words = self._entries.get(token)
+            if words is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return words
+
+    def set(self, token, words):
+        with self._lock:
+            self._entries[token] = words
+            self._entries.move_to_end(token)
+            if self._new_entries is not None:
+                self._new_entries.append((token, words))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    # Catat entri baru sejak pemanggilan terakhir (dipakai worker proses untuk
+    # mengirim hasilnya kembali ke cache induk)
+    def track_new_entries(self):
+        with self._lock:
+            self._new_entries = []
+
+    def pop_new_entries(self):
+        with self._lock:
+            entries, self._new_entries = self._new_entries or [], []
+            return entries
+
+    def merge(self, entries, hits=0, misses=0):
+        for token, words in entries:
+            self.set(token, words)
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    # Simpan ke disk secara atomik supaya worker lain tidak membaca file setengah jadi
+    def save(self, path):
+        with self._lock:
+            payload = {"fingerprint": self.fingerprint, "entries": list(self._entries.items())}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            joblib.dump(payload, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # Isi cache dari file; diabaikan kalau file tidak ada atau fingerprint kamus berbeda
+    def warm(self, path):
+        if not os.path.exists(path):
+            return 0
+        try:
+            payload = joblib.load(path)
+        except Exception:
+            return 0
+        if payload.get("fingerprint") != self.fingerprint:
+            return 0
+
+        entries = payload.get("entries", [])[-self.maxsize:]
+        with self._lock:
+            for token, words in reversed(entries):
+                if token not in self._entries:
+                    self._entries[token] = words
+                    self._entries.move_to_end(token, last=False)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return len(entries)
@@ -0,0 +1,220 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+
+import joblib
+import numpy as np
+
+from utils.registry import CACHE_DIR
+from utils.snapshot import atomic_write
+
+TOPIC_CACHE_DIR = os.path.join(CACHE_DIR, "topics")
+
+DEFAULT_N_TOPICS = 5
+TOP_WORDS = 10
+
+# LDA online (mini-batch): model lama bisa menyerap dokumen baru lewat partial_fit
+LDA_PARAMS = {"learning_method": "online", "batch_size": 256, "learning_offset": 10.0,
+              "max_iter": 10, "random_state": 42}
+VECTORIZER_PARAMS = {"max_df": 0.95, "min_df": 2, "max_features": 5000}
+
+# Model lama hanya diperbarui jika dokumen barunya tidak lebih banyak dari dokumen
+# yang sudah diserap; vocabulary model lama tetap, jadi korpus yang berubah
+# terlalu jauh lebih baik dilatih ulang
+MAX_INCREMENTAL_RATIO = 1.0
+
+# Jumlah model yang disimpan per sentimen + jumlah topik
+KEEP_MODELS = 3
+
+_memory = OrderedDict()
+_memory_size = 16
+_lock = threading.Lock()
+
+def _doc_hash(document):
+    return hashlib.sha256(document.encode("utf-8", "surrogatepass")).digest()[:16]
+
+def _documents(texts):
+    return [text for text in (str(text).strip() for text in texts) if text]
+
+# Fingerprint korpus + parameter model; kunci cache model dan HTML pyLDAvis
+def corpus_fingerprint(documents, n_topics):
+    digest = hashlib.sha256(json.dumps([n_topics, LDA_PARAMS, VECTORIZER_PARAMS], sort_keys=True).encode("utf-8"))
+    for document in documents:
+        digest.update(_doc_hash(document))
+    return digest.hexdigest()
+
+def _slug(label):
+    return str(label).lower().replace(" ", "_")
+
+def _paths(label, n_topics, fingerprint, cache_dir):
+    stem = os.path.join(cache_dir, f"{_slug(label)}.k{n_topics}-{fingerprint[:16]}")
+    return f"{stem}.joblib", f"{stem}.html"
+
+def _remember(key, result):
+    with _lock:
+        _memory[key] = result
+        _memory.move_to_end(key)
+        while len(_memory) > _memory_size:
+            _memory.popitem(last=False)
+    return result
+
+# Ambil model topik yang sudah ada di cache (memori atau disk); None jika belum pernah dibangun
+def load_topic_model(texts, label, n_topics=DEFAULT_N_TOPICS, cache_dir=TOPIC_CACHE_DIR):
+    fingerprint = corpus_fingerprint(_documents(texts), n_topics)
+    key = (_slug(label), fingerprint)
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+
+    model_path, html_path = _paths(label, n_topics, fingerprint, cache_dir)
+    if not (os.path.exists(model_path) and os.path.exists(html_path)):
+        return None
+
+    artifact = joblib.load(model_path)
+    with open(html_path, "r", encoding="utf-8") as f:
+        html = f.read()
+    return _remember(key, _result(artifact, html, fingerprint))
+
+# Bangun model topik untuk satu sentimen. Jika ada model lama dengan jumlah topik sama
+# yang dokumennya termasuk di korpus ini, hanya dokumen baru yang diserap (partial_fit).
+def build_topic_model(texts, label, n_topics=DEFAULT_N_TOPICS, n_jobs=-1, cache_dir=TOPIC_CACHE_DIR):
+    cached = load_topic_model(texts, label, n_topics, cache_dir)
+    if cached is not None:
+        return cached
+
+    documents = _documents(texts)
+    fingerprint = corpus_fingerprint(documents, n_topics)
+    doc_hashes = [_doc_hash(document) for document in documents]
+
+    base = _find_base_model(label, n_topics, Counter(doc_hashes), cache_dir)
+    if base is not None:
+        artifact = _update_model(base, documents, doc_hashes, n_jobs)
+    else:
+        artifact = _fit_model(documents, doc_hashes, n_topics, n_jobs)
+
+    dtm = artifact["vectorizer"].transform(documents)
+    html = _render_html(artifact, dtm, n_jobs)
+
+    model_path, html_path = _paths(label, n_topics, fingerprint, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    atomic_write(html_path, lambda path: _write_text(path, html))
+    atomic_write(model_path, lambda path: joblib.dump(artifact, path))
+    _remove_old_models(label, n_topics, cache_dir)
+    return _remember((_slug(label), fingerprint), _result(artifact, html, fingerprint))
+
+def _result(artifact, html, fingerprint):
+    return {
+        "fingerprint": fingerprint,
+        "html": html,
+        "topics": artifact["topics"],
+        "n_documents": len(artifact["doc_hashes"]),
+        "n_new_documents": artifact["n_new_documents"],
+        "incremental": artifact["incremental"],
+    }
+
+def _fit_model(documents, doc_hashes, n_topics, n_jobs):
+    from sklearn.decomposition import LatentDirichletAllocation
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    if len(documents) < 2:
+        raise ValueError("Jumlah komentar terlalu sedikit untuk pemodelan topik.")
+
+    vectorizer = CountVectorizer(**VECTORIZER_PARAMS)
+    try:
+        dtm = vectorizer.fit_transform(documents)
+    except ValueError:
+        raise ValueError("Tidak ada kata yang cukup sering muncul untuk pemodelan topik.")
+
+    lda = LatentDirichletAllocation(n_components=n_topics, total_samples=len(documents), n_jobs=n_jobs,
+                                    **LDA_PARAMS)
+    lda.fit(dtm)
+    return _artifact(vectorizer, lda, doc_hashes, len(documents), incremental=False)
+
+def _update_model(base, documents, doc_hashes, n_jobs):
+    vectorizer, lda = base["vectorizer"], base["lda"]
+
+    # dokumen yang belum pernah diserap model lama (selisih multiset, urutan dipertahankan)
+    absorbed = Counter(base["doc_hashes"])
+    new_documents = []
+    for document, doc_hash in zip(documents, doc_hashes):
+        if absorbed[doc_hash] > 0:
+            absorbed[doc_hash] -= 1
+        else:
+            new_documents.append(document)
+
+    lda.set_params(total_samples=len(documents), n_jobs=n_jobs)
+    if new_documents:
+        dtm = vectorizer.transform(new_documents)
+        batch_size = lda.batch_size
+        for start in range(0, dtm.shape[0], batch_size):
+            lda.partial_fit(dtm[start:start + batch_size])
+    return _artifact(vectorizer, lda, doc_hashes, len(new_documents), incremental=True)
+
+def _artifact(vectorizer, lda, doc_hashes, n_new_documents, incremental):
+    vocabulary = vectorizer.get_feature_names_out()
+    topics = [
+        [str(vocabulary[i]) for i in np.argsort(weights)[::-1][:TOP_WORDS]]
+        for weights in lda.components_
+    ]
+    return {
+        "vectorizer": vectorizer,
+        "lda": lda,
+        "doc_hashes": doc_hashes,
+        "topics": topics,
+        "n_new_documents": n_new_documents,
+        "incremental": incremental,
+    }
+
+# Model terbaru (sentimen + jumlah topik sama) yang semua dokumennya ada di korpus baru
+def _find_base_model(label, n_topics, doc_counts, cache_dir):
+    pattern = os.path.join(cache_dir, f"{_slug(label)}.k{n_topics}-*.joblib")
+    total = sum(doc_counts.values())
+    for path in sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True):
+        try:
+            base = joblib.load(path)
+        except Exception:
+            continue
+        base_counts = Counter(base["doc_hashes"])
+        n_new = total - sum(base_counts.values())
+        if n_new < 0 or n_new > MAX_INCREMENTAL_RATIO * len(base["doc_hashes"]):
+            continue
+        if all(doc_counts[doc_hash] >= count for doc_hash, count in base_counts.items()):
+            return base
+    return None
+
+def _render_html(artifact, dtm, n_jobs):
+    import pyLDAvis
+
+    lda = artifact["lda"]
+    # pyLDAvis butuh panjang dokumen > 0; dokumen tanpa kata di vocabulary dilewati
+    doc_lengths = np.asarray(dtm.sum(axis=1)).ravel()
+    dtm = dtm[doc_lengths > 0]
+    if dtm.shape[0] == 0:
+        raise ValueError("Tidak ada komentar yang memuat kata dari vocabulary model topik.")
+
+    topic_term = lda.components_ / lda.components_.sum(axis=1)[:, None]
+    prepared = pyLDAvis.prepare(
+        topic_term_dists=topic_term,
+        doc_topic_dists=lda.transform(dtm),
+        doc_lengths=doc_lengths[doc_lengths > 0],
+        vocab=artifact["vectorizer"].get_feature_names_out().tolist(),
+        term_frequency=np.asarray(dtm.sum(axis=0)).ravel(),
+        n_jobs=n_jobs,
+        sort_topics=False,
+    )
+    return pyLDAvis.prepared_data_to_html(prepared)
+
+def _write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def _remove_old_models(label, n_topics, cache_dir):
+    pattern = os.path.join(cache_dir, f"{_slug(label)}.k{n_topics}-*.joblib")
+    for model_path in sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)[KEEP_MODELS:]:
+        for path in (model_path, model_path[:-len(".joblib")] + ".html"):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,104 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.snapshot import SNAPSHOT_DIR, atomic_write, cached_artifact, load_table
+from utils.processing import LABEL_MAP
+from utils.registry import CACHE_DIR
+
+WORDCLOUD_CACHE_DIR = os.path.join(CACHE_DIR, "wordcloud")
+
+# Parameter render yang dipakai di halaman Home
+WORDCLOUD_PARAMS = {"width": 800, "height": 300, "background_color": "black"}
+
+# Tokenisasi sama dengan WordCloud.process_text bawaan (min_word_length=0)
+_WORD_PATTERN = r"\w[\w']*"
+
+# Frekuensi kata per label, dihitung secara vektor dengan pandas.
+# Mengikuti filter bawaan WordCloud: buang "'s", angka, dan stopwords bahasa Inggris.
+def term_frequencies(texts, labels):
+    from wordcloud import STOPWORDS
+
+    words = pd.Series(texts, dtype=object).astype(str).str.findall(_WORD_PATTERN)
+    exploded = pd.DataFrame({"label": list(labels), "word": words.values}).explode("word").dropna()
+    if exploded.empty:
+        return {}
+
+    word = exploded["word"].astype(str)
+    word = word.where(~word.str.lower().str.endswith("'s"), word.str[:-2])
+    keep = ~word.str.isdigit() & ~word.str.lower().isin({w.lower() for w in STOPWORDS}) & (word != "")
+    counts = exploded.assign(word=word)[keep].groupby(["label", "word"]).size()
+
+    return {
+        label: group.droplevel(0).sort_values(ascending=False).to_dict()
+        for label, group in counts.groupby(level=0)
+    }
+
+# Gabungkan index frekuensi (dipakai mode streaming: index dibangun per chunk)
+def merge_term_frequencies(index, other):
+    for label, frequencies in other.items():
+        target = index.setdefault(label, {})
+        for word, count in frequencies.items():
+            target[word] = target.get(word, 0) + count
+    return index
+
+# Index frekuensi untuk file hasil preprocessing (kolom "after" + "label")
+def load_term_index(cleaned_data_path, snapshot_dir=SNAPSHOT_DIR):
+    def build(path):
+        df = load_table(path, snapshot_dir)
+        return term_frequencies(df["after"], df["label"].map(LABEL_MAP))
+
+    return cached_artifact(cleaned_data_path, "terms", build, snapshot_dir)
+
+# --- Cache gambar berbasis konten ---
+# Kunci = hash dari frekuensi + parameter render, jadi gambar yang sama tidak
+# pernah dirender dua kali, baik untuk dataset penelitian maupun hasil upload.
+_image_memory = OrderedDict()
+_image_memory_size = 32
+_lock = threading.Lock()
+
+def _image_key(frequencies, params):
+    payload = json.dumps([sorted(frequencies.items()), sorted(params.items())], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _render_png(frequencies, params):
+    from wordcloud import WordCloud
+
+    wordcloud = WordCloud(**params).generate_from_frequencies(frequencies)
+    buffer = io.BytesIO()
+    wordcloud.to_image().save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def wordcloud_png(frequencies, params=None, cache_dir=WORDCLOUD_CACHE_DIR):
+    params = dict(WORDCLOUD_PARAMS if params is None else params)
+    if not frequencies:
+        return None
+
+    key = _image_key(frequencies, params)
+    with _lock:
+        if key in _image_memory:
+            _image_memory.move_to_end(key)
+            return _image_memory[key]
+
+    image_path = os.path.join(cache_dir, f"{key}.png")
+    if os.path.exists(image_path):
+        with open(image_path, "rb") as f:
+            png = f.read()
+    else:
+        png = _render_png(frequencies, params)
+        atomic_write(image_path, lambda path: _write_bytes(path, png))
+
+    with _lock:
+        _image_memory[key] = png
+        while len(_image_memory) > _image_memory_size:
+            _image_memory.popitem(last=False)
+    return png